@@ -0,0 +1,96 @@
+import os
+import json
+from speech_classifier import DEFAULT_MODEL, PROMPT_VERSION, build_prompt, chunk_text, parse_label_indices, merge_labels
+from classification_cache import chunk_key
+
+BATCH_DIR = "batch_requests"
+BATCH_ENDPOINT = "/v1/chat/completions"
+MAX_REQUESTS_PER_SHARD = 50_000            # Batch API limit per input file
+MAX_BYTES_PER_SHARD = 190 * 1024 * 1024    # stay under the 200 MB input file limit
+
+
+# (cache key, chunk) for every chunk of a document, the same split the runner uses
+def doc_chunks(text, speech_type, model=DEFAULT_MODEL):
+    return [(chunk_key(model, PROMPT_VERSION, speech_type, chunk), chunk) for chunk in chunk_text(text) or [""]]
+
+
+# One line of a Batch API request file; custom_id is the chunk's cache key so results
+# can be matched back without a separate manifest
+def batch_request(key, prompt, model=DEFAULT_MODEL):
+    return {
+        "custom_id": key,
+        "method": "POST",
+        "url": BATCH_ENDPOINT,
+        "body": {"model": model, "messages": [{"role": "user", "content": prompt}]},
+    }
+
+
+# Write a request for every chunk not yet answered in `cache` to <prefix>_00000.jsonl, <prefix>_00001.jsonl, ...
+# Identical chunks are requested once. Returns the shard paths and the number of requests written.
+def export_requests(docs, prefix, speech_type, model=DEFAULT_MODEL, cache=None,
+                    max_requests=MAX_REQUESTS_PER_SHARD, max_bytes=MAX_BYTES_PER_SHARD):
+    os.makedirs(os.path.dirname(prefix) or ".", exist_ok=True)
+    paths = []
+    seen = set()
+    f = None
+    n_requests = n_bytes = total = 0
+
+    for _, text in docs:
+        for key, chunk in doc_chunks(text, speech_type, model):
+            if key in seen or (cache is not None and key in cache):
+                continue
+            seen.add(key)
+            line = (json.dumps(batch_request(key, build_prompt(chunk, speech_type), model)) + "\n").encode("utf-8")
+
+            if f is None or n_requests >= max_requests or n_bytes + len(line) > max_bytes:
+                if f is not None:
+                    f.close()
+                paths.append(f"{prefix}_{len(paths):05}.jsonl")
+                f = open(paths[-1], "wb")
+                n_requests = n_bytes = 0
+            f.write(line)
+            n_requests += 1
+            n_bytes += len(line)
+            total += 1
+
+    if f is not None:
+        f.close()
+    return paths, total
+
+
+# Stream (custom_id, label indices) from Batch API output or error files.
+# Indices are None for requests that errored, so those chunks stay unanswered and get retried.
+def iter_results(paths):
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                response = record.get("response") or {}
+                if record.get("error") or response.get("status_code") != 200:
+                    yield record["custom_id"], None
+                    continue
+                content = response["body"]["choices"][0]["message"]["content"]
+                yield record["custom_id"], parse_label_indices(content)
+
+
+# Store every answered chunk from the result files in the cache; returns (answered, failed) counts
+def ingest_results(paths, cache):
+    answered = failed = 0
+    for key, indices in iter_results(paths):
+        if indices is None:
+            failed += 1
+        else:
+            cache.put(key, indices)
+            answered += 1
+    return answered, failed
+
+
+# (doc_id, labels) for every document whose chunks are all answered in the cache
+def collect_labels(docs, speech_type, cache, model=DEFAULT_MODEL):
+    for doc_id, text in docs:
+        answers = [cache.get(key) for key, _ in doc_chunks(text, speech_type, model)]
+        if any(answer is None for answer in answers):
+            continue
+        yield doc_id, merge_labels(set().union(*answers))
@@ -0,0 +1,108 @@
+import os
+import time
+import argparse
+import numpy as np
+from multiprocessing import Pool
+from keyword_matcher import KeywordMatcher, LABEL_KEYWORDS_FILE
+from speech_corpus import SpeechCorpus, open_corpus, CORPUS_PATTERNS
+
+OUTPUT_FILE = "keyword_label_masks.npz"
+BLOCK_SIZE = 5000   # speeches per pool task
+
+# Per-worker state, set up once by the pool initializer
+_matcher = None
+_corpora = {}
+
+
+def _init_worker(keywords_file):
+    global _matcher
+    _matcher = KeywordMatcher.from_file(keywords_file)
+
+
+def _label_block(task):
+    path, start, stop = task
+    corpus = _corpora.get(path)
+    if corpus is None:
+        corpus = _corpora[path] = SpeechCorpus(path)
+    masks = np.empty(stop - start, dtype=np.uint32)
+    for j, i in enumerate(range(start, stop)):
+        masks[j] = _matcher.match_mask(corpus.text(i))
+    return masks
+
+
+# Keyword-label every speech of the corpus across all cores.
+# Returns (ids, masks) where bit i of masks[k] is set when label i matched speech ids[k].
+def label_corpus(corpus, keywords_file=LABEL_KEYWORDS_FILE, workers=None, block_size=BLOCK_SIZE):
+    tasks = [(part.path, start, min(start + block_size, len(part)))
+             for part in corpus.parts for start in range(0, len(part), block_size)]
+
+    blocks = []
+    done = 0
+    with Pool(workers or os.cpu_count(), initializer=_init_worker, initargs=(keywords_file,)) as pool:
+        for masks in pool.imap(_label_block, tasks):
+            blocks.append(masks)
+            done += len(masks)
+            print(f"Labeled {done}/{len(corpus)} speeches...", end="\r")
+    print()
+
+    masks = np.concatenate(blocks) if blocks else np.empty(0, dtype=np.uint32)
+    return corpus.ids, masks
+
+
+def save_masks(path, ids, masks, labels):
+    np.savez(path, ids=ids, masks=masks, labels=np.array(labels))
+
+
+def load_masks(path=OUTPUT_FILE):
+    data = np.load(path)
+    return data["ids"], data["masks"], list(data["labels"])
+
+
+# Number of speeches carrying each label
+def label_counts(masks, n_labels):
+    bits = (masks[:, None] >> np.arange(n_labels, dtype=np.uint32)) & 1
+    return bits.sum(axis=0)
+
+
+# Draw up to per_label speech ids for every label; a speech drawn for one label is not reused
+def balanced_sample(ids, masks, n_labels, per_label, seed=42):
+    rng = np.random.default_rng(seed)
+    taken = np.zeros(len(ids), dtype=bool)
+    sample = {}
+    for i in range(n_labels):
+        rows = np.flatnonzero(((masks >> i) & 1).astype(bool) & ~taken)
+        rows = rng.choice(rows, min(per_label, len(rows)), replace=False)
+        taken[rows] = True
+        sample[i] = ids[rows]
+    return sample
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Keyword-label the downloaded corpus offline across a process pool.")
+    parser.add_argument("patterns", nargs="*", default=CORPUS_PATTERNS)
+    parser.add_argument("--output", default=OUTPUT_FILE)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--per-label", type=int, default=0, help="also draw a balanced sample of this many ids per label")
+    args = parser.parse_args()
+
+    corpus = open_corpus(*args.patterns)
+    labels = KeywordMatcher.from_file().labels
+    print(f"Labeling {len(corpus)} speeches from {len(corpus.parts)} corpus parts...")
+
+    start = time.perf_counter()
+    ids, masks = label_corpus(corpus, workers=args.workers)
+    elapsed = time.perf_counter() - start
+    print(f"Done in {elapsed:.1f}s ({len(ids) / max(elapsed, 1e-9):,.0f} speeches/sec)")
+
+    save_masks(args.output, ids, masks, labels)
+    print(f"Saved label masks to {args.output}")
+
+    for label, count in zip(labels, label_counts(masks, len(labels))):
+        print(f"  {label}: {count}")
+
+    if args.per_label:
+        sample = balanced_sample(ids, masks, len(labels), args.per_label)
+        sample_file = f"keyword_balanced_sample_{args.per_label}.npz"
+        np.savez(sample_file, **{f"label_{i:02d}": sample_ids for i, sample_ids in sample.items()},
+                 labels=np.array(labels))
+        print(f"Saved balanced sample ids to {sample_file}")
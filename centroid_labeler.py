@@ -0,0 +1,272 @@
+import json
+import time
+import argparse
+import numpy as np
+from embedding_store import open_store, check_model, embedding_model, CONGRESS_STORE
+from compute_norm_centroids import centroids_model, join_rows
+from bulk_label_keywords import label_counts
+from speech_dataset import load_dataset
+
+CENTROIDS_FILE = "label_centroids_normalized.npz"   # presidential (text-embedding-ada-002) centroids
+THRESHOLDS_FILE = "centroid_thresholds.json"
+# Congress stores use another embedding model, so they get centroids and thresholds of their own:
+#   python compute_norm_centroids.py --store STORE --masks keyword_label_masks.npz --output congress_label_centroids.npz
+CONGRESS_CENTROIDS_FILE = "congress_label_centroids.npz"
+CONGRESS_THRESHOLDS_FILE = "congress_centroid_thresholds.json"
+CALIBRATION_MASKS = "keyword_label_masks.npz"
+OUTPUT_FILE = "centroid_label_masks.npz"
+ROUTED_JOURNAL = "label_journal_routed.jsonl"
+TOP_K = 5              # the LLM prompt also asks for at most 5 topics
+DEFAULT_THRESHOLD = 0.8
+ROUTE_MARGIN = 0.005   # top-k scores this close to their threshold count as low confidence
+BLOCK_SIZE = 20_000
+
+
+# Label names, the (L, D) float32 matrix of unit-norm centroids and the embedding model they
+# were built from (from the .json sidecar, None if untagged); "Unlabeled" is not a topic
+def load_centroids(path=CENTROIDS_FILE):
+    data = np.load(path)
+    labels = [label for label in data.files if label != "Unlabeled"]
+    centroids = np.stack([data[label] for label in labels]).astype(np.float32)
+    centroids /= np.linalg.norm(centroids, axis=1, keepdims=True)
+    return labels, centroids, centroids_model(path)
+
+
+# Per-label score cutoff that maximizes F1 against known labels.
+# scores is (N, L) cosine similarity, truth an (N, L) bool matrix of the reference labels.
+def calibrate_thresholds(scores, truth):
+    n, n_labels = scores.shape
+    thresholds = np.full(n_labels, np.inf, dtype=np.float32)
+    for j in range(n_labels):
+        positives = truth[:, j].sum()
+        if positives == 0:
+            continue
+        order = np.argsort(-scores[:, j])
+        tp = np.cumsum(truth[order, j])
+        # Taking the top k rows as predictions: F1 = 2 TP / (k + positives)
+        f1 = 2 * tp / (np.arange(1, n + 1) + positives)
+        thresholds[j] = scores[order[np.argmax(f1)], j]
+    return thresholds
+
+
+# Nearest-centroid topic labeler: one (N, D) x (D, L) product scores a block of embeddings
+# against every label, and a label is assigned when its score clears that label's
+# calibrated threshold and ranks among the top_k for the speech.
+class CentroidLabeler:
+    def __init__(self, labels, centroids, thresholds=None, top_k=TOP_K, model=None):
+        self.labels = labels
+        self.model = model
+        self.centroids_t = np.ascontiguousarray(centroids.T)
+        if thresholds is None:
+            thresholds = np.full(len(labels), DEFAULT_THRESHOLD, dtype=np.float32)
+        self.thresholds = np.asarray(thresholds, dtype=np.float32)
+        self.top_k = top_k
+        self.bits = np.uint32(1) << np.arange(len(labels), dtype=np.uint32)
+
+    @classmethod
+    def load(cls, centroids_path=CENTROIDS_FILE, thresholds_path=THRESHOLDS_FILE):
+        labels, centroids, model = load_centroids(centroids_path)
+        thresholds, top_k = None, TOP_K
+        try:
+            with open(thresholds_path, "r") as f:
+                saved = json.load(f)
+            # Thresholds live on the similarity scale of the model they were calibrated with
+            check_model(model, saved.get("model"), centroids_path, thresholds_path)
+            thresholds = [saved["thresholds"][label] for label in labels]
+            top_k = saved["top_k"]
+        except FileNotFoundError:
+            print(f"No {thresholds_path}; using a flat threshold of {DEFAULT_THRESHOLD}")
+        return cls(labels, centroids, thresholds, top_k, model)
+
+    def save_thresholds(self, path=THRESHOLDS_FILE):
+        with open(path, "w") as f:
+            json.dump({"model": self.model, "top_k": self.top_k,
+                       "thresholds": {label: float(t) for label, t in zip(self.labels, self.thresholds)}}, f, indent=2)
+
+    # Refuse embeddings from another model than the centroids
+    def require_model(self, model, source):
+        check_model(self.model, model, "the label centroids", source)
+
+    # Cosine similarity of every embedding to every centroid
+    def scores(self, embeddings):
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        return (embeddings @ self.centroids_t) / np.maximum(norms, 1e-12)
+
+    # Mask of the top_k scores in each row
+    def _top_k(self, scores):
+        k = min(self.top_k, scores.shape[1])
+        return scores >= -np.partition(-scores, k - 1, axis=1)[:, k - 1:k]
+
+    def assign(self, scores):
+        return (scores >= self.thresholds) & self._top_k(scores)
+
+    def to_masks(self, assigned):
+        return np.bitwise_or.reduce(np.where(assigned, self.bits, np.uint32(0)), axis=1)
+
+    # Distance of each row's closest top-k score to its label threshold; a small value means a
+    # small change in the embedding would flip a label, so the speech is worth an LLM call
+    def confidence(self, scores):
+        distance = np.where(self._top_k(scores), np.abs(scores - self.thresholds), np.inf)
+        return distance.min(axis=1)
+
+    def calibrate(self, embeddings, truth):
+        self.calibrate_scores(self.scores(embeddings), truth)
+
+    def calibrate_scores(self, scores, truth):
+        self.thresholds = calibrate_thresholds(scores, truth)
+
+    # Label every row of an embedding store block by block over its memmap.
+    # Returns (ids, masks, confidence) in store order.
+    def label_store(self, store, block_size=BLOCK_SIZE):
+        masks = np.empty(len(store), dtype=np.uint32)
+        confidence = np.empty(len(store), dtype=np.float32)
+        embeddings = store.embeddings
+        for start, stop in store.iter_blocks(block_size):
+            scores = self.scores(embeddings[start:stop])
+            masks[start:stop] = self.to_masks(self.assign(scores))
+            confidence[start:stop] = self.confidence(scores)
+        return np.array(store.column("ids")), masks, confidence
+
+
+# Calibrate against the LLM-labeled presidential speeches
+def calibrate_from_presidential(labeler, embeddings_path="president_speech_embeddings.npz",
+                                labels_path="president_speech_labels.npz"):
+    labeler.require_model(embedding_model(embeddings_path), embeddings_path)
+    embeddings_data = load_dataset(embeddings_path, mmap_mode="r")
+    labels_data = load_dataset(labels_path)
+    doc_names = embeddings_data["doc_names"]
+    order = np.argsort(labels_data["doc_names"])
+    label_names = labels_data["doc_names"][order]
+    pos = np.clip(np.searchsorted(label_names, doc_names), 0, len(label_names) - 1)
+    found = label_names[pos] == doc_names
+
+    embeddings = np.asarray(embeddings_data["embeddings"][found], dtype=np.float32)
+    # Reorder the dataset's label columns to the labeler's label order
+    columns = [labels_data.label_names.index(label) if label in labels_data.label_names else -1
+               for label in labeler.labels]
+    matrix = np.concatenate([labels_data.label_matrix(), np.zeros((len(labels_data), 1), dtype=bool)], axis=1)
+    truth = matrix[order[pos[found]]][:, columns]
+    labeler.calibrate(embeddings, truth)
+    report_calibration(labeler, labeler.scores(embeddings), truth)
+
+
+def report_calibration(labeler, scores, truth):
+    predicted = labeler.assign(scores)
+    tp = (predicted & truth).sum()
+    precision = tp / max(predicted.sum(), 1)
+    recall = tp / max(truth.sum(), 1)
+    print(f"Calibrated on {len(scores)} speeches: precision {precision:.3f}, recall {recall:.3f}")
+
+
+# Calibrate on a store's own speeches against a label-mask npz (ids, masks, labels) joined on id,
+# so thresholds are on the same model's similarity scale as the vectors they will label
+def calibrate_from_masks(labeler, store, masks_path=CALIBRATION_MASKS, block_size=BLOCK_SIZE):
+    labeler.require_model(store.model, store.path)
+    data = np.load(masks_path)
+    rows = join_rows(np.asarray(store.column("ids")), data["ids"])
+    labeled = np.flatnonzero(rows >= 0)
+    mask_labels = list(data["labels"])
+    bits = np.array([np.uint32(1) << mask_labels.index(label) if label in mask_labels else 0
+                     for label in labeler.labels], dtype=np.uint32)
+    truth = (data["masks"][rows[labeled]].astype(np.uint32)[:, None] & bits) > 0
+
+    embeddings = store.embeddings
+    scores = np.concatenate([labeler.scores(embeddings[labeled[start:start + block_size]])
+                             for start in range(0, len(labeled), block_size)])
+    labeler.calibrate_scores(scores, truth)
+    report_calibration(labeler, scores, truth)
+
+
+# Rows to send to the LLM: confidence below margin, at most max_routed of the least confident
+def select_routed(confidence, margin=ROUTE_MARGIN, max_routed=None):
+    routed = confidence < margin
+    if max_routed is not None and routed.sum() > max_routed:
+        routed[:] = False
+        routed[np.argsort(confidence, kind="stable")[:max_routed]] = True
+    return routed
+
+
+# Send the low-confidence speeches to the LLM labeler and overwrite their centroid masks
+def route_to_llm(labeler, ids, masks, uncertain, journal_path=ROUTED_JOURNAL):
+    from speech_corpus import open_corpus
+    from label_journal import LabelJournal
+    from classification_cache import ClassificationCache
+    from speech_classifier import ClassificationRunner, PROMPT_VERSION
+
+    corpus = open_corpus()
+    corpus_ids = corpus.ids
+    order = np.argsort(corpus_ids)
+    routed = ids[uncertain]
+    pos = np.clip(np.searchsorted(corpus_ids[order], routed), 0, len(order) - 1)
+    found = corpus_ids[order][pos] == routed
+    if not found.all():
+        print(f"{int((~found).sum())} routed ids are not in the corpus; keeping their centroid labels")
+    rows = order[pos[found]]
+
+    runner = ClassificationRunner(speech_type="congressional", cache=ClassificationCache())
+    journal = LabelJournal(journal_path, runner.model, PROMPT_VERSION)
+
+    def on_result(doc_id, labels):
+        if labels is not None:
+            journal.record(int(doc_id), labels)
+
+    todo = [(int(corpus_ids[r]), corpus.text(int(r))) for r in rows if journal.get(int(corpus_ids[r])) is None]
+    print(f"Sending {len(todo)} low-confidence speeches to the LLM ({len(rows) - len(todo)} already journaled)")
+    runner.classify(todo, on_result)
+    journal.close()
+    runner.cache.close()
+
+    index = {label: j for j, label in enumerate(labeler.labels)}
+    row_of = {int(doc_id): i for i, doc_id in enumerate(ids)}
+    for doc_id, labels in journal.labels.items():
+        i = row_of.get(int(doc_id))
+        if i is not None:
+            masks[i] = np.bitwise_or.reduce([labeler.bits[index[l]] for l in labels if l in index] or [np.uint32(0)])
+    return masks
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Zero-shot topic labels for stored embeddings by nearest label centroid.")
+    parser.add_argument("--store", default=CONGRESS_STORE)
+    parser.add_argument("--output", default=OUTPUT_FILE)
+    parser.add_argument("--centroids", default=CONGRESS_CENTROIDS_FILE, help="label centroids built from the store's embedding model")
+    parser.add_argument("--thresholds", default=CONGRESS_THRESHOLDS_FILE)
+    parser.add_argument("--calibrate", nargs="?", const="masks", choices=["masks", "presidential"],
+                        help="fit per-label thresholds and save them to --thresholds: on the store's own speeches "
+                             "against --masks (default), or on the LLM-labeled presidential speeches")
+    parser.add_argument("--masks", default=CALIBRATION_MASKS, help="label-mask npz to calibrate against")
+    parser.add_argument("--top-k", type=int, default=None)
+    parser.add_argument("--margin", type=float, default=ROUTE_MARGIN)
+    parser.add_argument("--route", action="store_true", help="relabel low-confidence speeches with the LLM")
+    parser.add_argument("--max-routed", type=int, default=None, help="route at most this many of the least confident speeches")
+    args = parser.parse_args()
+
+    labeler = CentroidLabeler.load(args.centroids, args.thresholds)
+    if args.top_k:
+        labeler.top_k = args.top_k
+    store = open_store(args.store)
+    labeler.require_model(store.model, args.store)
+    if args.calibrate == "masks":
+        calibrate_from_masks(labeler, store, args.masks)
+    elif args.calibrate == "presidential":
+        calibrate_from_presidential(labeler)
+    if args.calibrate:
+        labeler.save_thresholds(args.thresholds)
+        print(f"Saved thresholds to {args.thresholds}")
+
+    start = time.perf_counter()
+    ids, masks, confidence = labeler.label_store(store)
+    uncertain = select_routed(confidence, args.margin, args.max_routed)
+    elapsed = time.perf_counter() - start
+    print(f"Labeled {len(ids)} embeddings in {elapsed:.2f}s ({len(ids) / max(elapsed, 1e-9):,.0f}/sec); "
+          f"{int(uncertain.sum())} low confidence")
+
+    if args.route and uncertain.any():
+        masks = route_to_llm(labeler, ids, masks, uncertain)
+
+    np.savez(args.output, ids=ids, masks=masks, labels=np.array(labeler.labels), confidence=confidence,
+             routed=uncertain & args.route)
+    print(f"Saved label masks to {args.output}")
+    for label, count in zip(labeler.labels, label_counts(masks, len(labeler.labels))):
+        print(f"  {label}: {count}")
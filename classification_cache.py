@@ -0,0 +1,61 @@
+import os
+import json
+import hashlib
+
+CACHE_PATH = "classification_cache.jsonl"
+
+
+# Key of one classification call: model, prompt template version, speech type and chunk text
+def chunk_key(model, prompt_version, speech_type, chunk):
+    payload = json.dumps([model, prompt_version, speech_type, chunk])
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+
+# Persistent cache of answered chunks: key -> list of topic indices.
+# Only real answers are stored; an empty list means the model said "None", while a chunk
+# whose call failed is simply absent and gets retried. Backed by an append-only JSON Lines
+# file that is replayed into a dict on open; with path=None it only lives in memory.
+class ClassificationCache:
+    def __init__(self, path=CACHE_PATH):
+        self.path = path
+        self.entries = {}
+        self.f = None
+        if path is None:
+            return
+
+        if os.path.exists(path):
+            good = 0
+            with open(path, "rb") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        break  # torn last line from an interrupted run
+                    self.entries[record["key"]] = record["labels"]
+                    good += len(line)
+            # Drop a torn tail so new appends start on a fresh line
+            if good != os.path.getsize(path):
+                with open(path, "r+b") as f:
+                    f.truncate(good)
+        self.f = open(path, "a")
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def get(self, key):
+        return self.entries.get(key)
+
+    def put(self, key, label_indices):
+        labels = sorted(label_indices)
+        self.entries[key] = labels
+        if self.f is not None:
+            self.f.write(json.dumps({"key": key, "labels": labels}) + "\n")
+            self.f.flush()
+
+    def close(self):
+        if self.f is not None:
+            self.f.close()
+            self.f = None
@@ -1,50 +1,148 @@
+import json
+import argparse
 import numpy as np
-from collections import defaultdict
+from scipy import sparse
 from sklearn.preprocessing import normalize
+from embedding_store import open_store, embedding_model
+from speech_dataset import load_dataset
 
-# Step 1: Load embeddings
-print("Loading embeddings...")
-embeddings_data = np.load("president_speech_embeddings.npz", allow_pickle=True)
-doc_names = embeddings_data["doc_names"]
-embeddings = embeddings_data["embeddings"]
-print(f"Loaded {len(doc_names)} embeddings.")
-
-# Step 2: Load labels
-print("Loading labels...")
-labels_data = np.load("president_speech_labels.npz", allow_pickle=True)
-label_doc_names = labels_data["doc_names"]
-label_labels = labels_data["labels"]
-print(f"Loaded {len(label_doc_names)} labeled documents.")
-
-# Step 3: Build mapping from doc_name to labels
-doc_to_labels = {name: lbl for name, lbl in zip(label_doc_names, label_labels)}
-
-# Step 4: Group embeddings by label
-print("Grouping embeddings by label...")
-label_to_embeddings = defaultdict(list)
-missing_count = 0
-
-for doc_name, emb in zip(doc_names, embeddings):
-    labels = doc_to_labels.get(doc_name)
-    if labels is None:
-        missing_count += 1
-        continue
-    for label in labels:
-        label_to_embeddings[label].append(emb)
-
-print(f"Grouped embeddings for {len(label_to_embeddings)} labels.")
-if missing_count > 0:
-    print(f"Skipped {missing_count} documents with no labels.")
-
-# Step 5: Compute normalized centroids
-print("Computing normalized label centroids...")
-label_centroids = {
-    label: normalize(np.mean(vecs, axis=0, keepdims=True))[0]
-    for label, vecs in label_to_embeddings.items()
-}
-print("Finished computing centroids.")
-
-# Step 6: Save to .npz file
-output_path = "label_centroids_normalized.npz"
-np.savez(output_path, **label_centroids)
-print(f"Saved normalized centroids to '{output_path}'.")
+OUTPUT_PATH = "label_centroids_normalized.npz"
+BLOCK_SIZE = 10_000
+
+
+# The centroids npz holds only label -> vector arrays; the embedding model they were built
+# from is recorded in a <name>.json sidecar next to it
+def model_path(centroids_path):
+    return centroids_path.removesuffix(".npz") + ".json"
+
+
+def save_centroids(path, label_centroids, model=None):
+    np.savez(path, **label_centroids)
+    with open(model_path(path), "w") as f:
+        json.dump({"model": model}, f, indent=2)
+
+
+# Embedding model of a centroids file, or None if it has no sidecar (untagged)
+def centroids_model(path):
+    try:
+        with open(model_path(path), "r") as f:
+            return json.load(f).get("model")
+    except FileNotFoundError:
+        return None
+
+
+# Sparse (N, L) 0/1 matrix straight from a dataset's CSR label index
+def label_indicator(dataset):
+    offsets, codes = dataset["label_offsets"], dataset["label_codes"]
+    data = np.ones(len(codes), dtype=np.float64)
+    indicator = sparse.csr_matrix((data, np.asarray(codes, dtype=np.int64), np.asarray(offsets)),
+                                  shape=(len(dataset), len(dataset.label_names)))
+    indicator.sum_duplicates()
+    indicator.data[:] = 1.0
+    return indicator
+
+
+# Sparse (N, L) 0/1 matrix from uint32 label masks (bit i set = label i), as written by the bulk labelers
+def mask_indicator(masks, n_labels):
+    bits = ((np.asarray(masks)[:, None] >> np.arange(n_labels, dtype=np.uint32)) & 1).astype(np.float64)
+    return sparse.csr_matrix(bits)
+
+
+# For each key, its row in `table_keys` (or -1) through a sorted index instead of a dict
+def join_rows(keys, table_keys):
+    order = np.argsort(table_keys, kind="stable")
+    sorted_keys = table_keys[order]
+    pos = np.clip(np.searchsorted(sorted_keys, keys), 0, max(len(sorted_keys) - 1, 0))
+    found = sorted_keys[pos] == keys if len(sorted_keys) else np.zeros(len(keys), dtype=bool)
+    return np.where(found, order[pos], -1)
+
+
+# Sum embeddings per label with one sparse-dense product per block, so only a block of
+# embeddings is in memory at a time. blocks yields (embeddings, indicator rows) pairs.
+def centroid_sums(blocks, n_labels, dim):
+    sums = np.zeros((n_labels, dim), dtype=np.float64)
+    counts = np.zeros(n_labels, dtype=np.int64)
+    for embeddings, indicator in blocks:
+        sums += indicator.T @ np.asarray(embeddings, dtype=np.float64)
+        counts += np.asarray(indicator.sum(axis=0), dtype=np.int64).ravel()
+    return sums, counts
+
+
+def normalized_centroids(sums, counts, labels):
+    present = counts > 0
+    centroids = normalize(sums[present] / counts[present, None])
+    return {label: centroid for label, centroid in zip(np.array(labels)[present], centroids)}
+
+
+# Presidential speeches: embeddings and LLM labels from the two npz files, joined on doc_name
+def presidential_centroids(embeddings_path="president_speech_embeddings.npz",
+                           labels_path="president_speech_labels.npz", block_size=BLOCK_SIZE):
+    print("Loading embeddings...")
+    embeddings_data = load_dataset(embeddings_path, mmap_mode="r")
+    doc_names = embeddings_data["doc_names"]
+    embeddings = embeddings_data["embeddings"]
+    print(f"Loaded {len(doc_names)} embeddings.")
+
+    print("Loading labels...")
+    labels_data = load_dataset(labels_path)
+    label_doc_names = labels_data["doc_names"]
+    indicator, labels = label_indicator(labels_data), labels_data.label_names
+    print(f"Loaded {len(label_doc_names)} labeled documents.")
+
+    rows = join_rows(doc_names, label_doc_names)
+    missing_count = int((rows < 0).sum())
+    if missing_count > 0:
+        print(f"Skipped {missing_count} documents with no labels.")
+
+    def blocks():
+        for start in range(0, len(doc_names), block_size):
+            keep = np.flatnonzero(rows[start:start + block_size] >= 0)
+            block = embeddings[start:start + block_size][keep]
+            if len(block):
+                yield block, indicator[rows[start + keep]]
+
+    return centroid_sums(blocks(), len(labels), embeddings.shape[1]), labels, embedding_model(embeddings_path)
+
+
+# Any embedding store, labeled by a label-mask npz (ids, masks, labels) joined on id
+def store_centroids(store_path, masks_path, block_size=BLOCK_SIZE):
+    store = open_store(store_path)
+    masks_data = np.load(masks_path)
+    labels = list(masks_data["labels"])
+    print(f"Loaded {len(store)} embeddings from {store_path} and {len(masks_data['ids'])} label masks.")
+
+    rows = join_rows(np.asarray(store.column("ids")), masks_data["ids"])
+    missing_count = int((rows < 0).sum())
+    if missing_count > 0:
+        print(f"Skipped {missing_count} documents with no labels.")
+    masks = masks_data["masks"]
+
+    def blocks():
+        embeddings = store.embeddings
+        for start, stop in store.iter_blocks(block_size):
+            keep = np.flatnonzero(rows[start:stop] >= 0)
+            if len(keep):
+                yield embeddings[start:stop][keep], mask_indicator(masks[rows[start + keep]], len(labels))
+
+    return centroid_sums(blocks(), len(labels), store.dim), labels, store.model
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compute one normalized embedding centroid per topic label.")
+    parser.add_argument("--store", help="embedding store to use instead of the presidential npz files")
+    parser.add_argument("--masks", default="keyword_label_masks.npz", help="label-mask npz joined to --store by id")
+    parser.add_argument("--output", default=OUTPUT_PATH)
+    args = parser.parse_args()
+
+    if args.store:
+        (sums, counts), labels, model = store_centroids(args.store, args.masks)
+    else:
+        (sums, counts), labels, model = presidential_centroids()
+    print(f"Grouped embeddings for {int((counts > 0).sum())} labels.")
+
+    print("Computing normalized label centroids...")
+    label_centroids = normalized_centroids(sums, counts, labels)
+    print("Finished computing centroids.")
+
+    save_centroids(args.output, label_centroids, model)
+    print(f"Saved normalized {model or 'untagged'} centroids to '{args.output}'.")
@@ -0,0 +1,113 @@
+import numpy as np
+from matplotlib import colormaps
+from matplotlib.cm import ScalarMappable
+from matplotlib.colors import Normalize, ListedColormap
+from matplotlib.figure import Figure
+from compute_norm_centroids import join_rows
+
+GRID_SIZE = 512
+
+
+# Every (point, label code) pair, joined on id, from a label-mask npz (ids, masks, labels) or a
+# labeled typed dataset; a point carrying three labels yields three pairs.
+# Returns (points, codes, label_names).
+def label_pairs(ids, labels_path):
+    data = np.load(labels_path)
+    if "masks" in data:
+        names = list(data["labels"])
+        rows = join_rows(ids, data["ids"])
+        masks = np.where(rows >= 0, data["masks"][np.maximum(rows, 0)], 0).astype(np.uint32)
+        points, codes = np.nonzero((masks[:, None] >> np.arange(len(names), dtype=np.uint32)) & 1)
+        return points, codes.astype(np.int64), names
+    keys = data["ids"] if "ids" in data else data["doc_names"]
+    offsets, label_codes = data["label_offsets"], data["label_codes"]
+    rows = join_rows(ids, keys)
+    labeled = np.flatnonzero(rows >= 0)
+    lengths = np.diff(offsets)[rows[labeled]]
+    points = np.repeat(labeled, lengths)
+    # Position of each pair in label_codes: its row's offset plus its rank within the row
+    rank = np.arange(len(points)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    codes = label_codes[np.repeat(offsets[rows[labeled]], lengths) + rank]
+    return points, codes.astype(np.int64), list(data["label_names"])
+
+
+# Lowest label code of each point (-1 when unlabeled): a stable per-point key, e.g. for
+# stratified sampling. Not a measure of dominance; density_grid votes with every label.
+def first_labels(ids, labels_path):
+    points, codes, names = label_pairs(ids, labels_path)
+    first = np.full(len(ids), -1, dtype=np.int64)
+    order = np.lexsort((codes, points))
+    unique_points, start = np.unique(points[order], return_index=True)
+    first[unique_points] = codes[order][start]
+    return first, names
+
+
+# Flat grid cell of every point; the grid spans the points' bounding box
+def bin_points(xy, bins=GRID_SIZE):
+    xy = np.asarray(xy, dtype=np.float64)
+    low, high = xy.min(axis=0), xy.max(axis=0)
+    scale = bins / np.maximum(high - low, 1e-12)
+    cells = np.minimum(((xy - low) * scale).astype(np.int64), bins - 1)
+    extent = (low[0], high[0], low[1], high[1])
+    return cells[:, 1] * bins + cells[:, 0], extent
+
+
+# Per-cell point counts, mean of `values` and the label carried by the most points in the cell,
+# where `pairs` is (points, codes) from label_pairs and every label of a point casts a vote
+def density_grid(cells, bins=GRID_SIZE, values=None, pairs=None, n_labels=None, seed=0):
+    n_cells = bins * bins
+    counts = np.bincount(cells, minlength=n_cells)
+    grid = {"counts": counts.reshape(bins, bins)}
+    if values is not None:
+        sums = np.bincount(cells, weights=values, minlength=n_cells)
+        grid["mean"] = (sums / np.maximum(counts, 1)).reshape(bins, bins)
+    if pairs is not None:
+        points, codes = pairs
+        n_labels = n_labels or int(codes.max(initial=-1)) + 1
+        votes = np.bincount(cells[points] * n_labels + codes, minlength=n_cells * n_labels)
+        votes = votes.reshape(n_cells, n_labels)
+        # Ties (e.g. a lone point with three labels) are broken at random rather than toward
+        # the lowest label index; the jitter is below one vote, so it never overturns a count
+        jitter = np.random.default_rng(seed).random(votes.shape) * 0.5
+        grid["label"] = np.where(votes.max(axis=1) > 0, (votes + jitter).argmax(axis=1), -1).reshape(bins, bins)
+    return grid
+
+
+# Render the grid straight to a PNG with the Agg canvas: cell color from the aggregated value,
+# opacity from log density. Cost depends on the grid size, not the number of points.
+def render_density(path, xy, values=None, pairs=None, label_names=None, bins=GRID_SIZE,
+                   title="", xlabel="", ylabel="", value_label="Year", cmap="plasma"):
+    cells, extent = bin_points(xy, bins)
+    grid = density_grid(cells, bins, values, pairs, len(label_names) if label_names else None)
+    counts = grid["counts"]
+    alpha = np.log1p(counts) / max(np.log1p(counts.max()), 1e-12)
+
+    fig = Figure(figsize=(12, 8))
+    ax = fig.add_subplot()
+    if pairs is not None:
+        n_labels = len(label_names)
+        # tab20 then tab20b, so up to 40 labels get distinct colors
+        legend_map = ListedColormap((colormaps["tab20"].colors + colormaps["tab20b"].colors)[:max(n_labels, 1)])
+        rgba = legend_map(np.maximum(grid["label"], 0))
+        rgba[grid["label"] < 0] = (0.6, 0.6, 0.6, 1.0)
+    elif values is None:
+        norm = Normalize(0, 1)
+        rgba = colormaps[cmap](alpha)
+    else:
+        norm = Normalize(np.min(values), np.max(values))
+        rgba = colormaps[cmap](norm(grid["mean"]))
+    rgba[..., 3] = alpha
+    ax.imshow(rgba, origin="lower", extent=extent, aspect="auto", interpolation="nearest")
+
+    if pairs is not None:
+        bar = fig.colorbar(ScalarMappable(Normalize(-0.5, n_labels - 0.5), legend_map), ax=ax, ticks=np.arange(n_labels))
+        bar.ax.set_yticklabels(label_names, fontsize=7)
+    else:
+        fig.colorbar(ScalarMappable(norm=norm, cmap=cmap), ax=ax, label=value_label if values is not None else "Density")
+
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    ax.set_title(title)
+    ax.grid(True)
+    fig.tight_layout()
+    fig.savefig(path, dpi=100)
@@ -1,100 +1,94 @@
 import os
-import requests
+import sys
 import json
-import numpy as np
-from time import time, sleep
+from time import time
 from datetime import timedelta
+from speech_corpus import write_corpus
+from speech_downloader import iter_pages, filter_entry
 
-BASE_URL = "http://congressionalspeech.lib.uiowa.edu/api.php/speeches"
-OUTPUT_JSON = "congress_speeches.json"
-OUTPUT_NPZ = "congress_speeches.npz"
-CHECKPOINT_FILE = "congress_checkpoint.json"
+OUTPUT_CORPUS = "congress_speeches.corpus"
+LOG_FILE = "congress_speeches_log.jsonl"
+CURSOR_FILE = "congress_crawl_cursor.json"
 
-PAGE_SIZE = 50
 START_PAGE = 1
 
-# Load checkpoint if it exists
-if os.path.exists(CHECKPOINT_FILE):
-    with open(CHECKPOINT_FILE, "r") as f:
-        checkpoint = json.load(f)
-        all_data = checkpoint["data"]
-        current_page = checkpoint["last_page"] + 1
-        print(f"Resuming from page {current_page}...")
-else:
-    all_data = []
-    current_page = START_PAGE
+# The crawl is checkpointed as an append-only JSON Lines log of speeches plus a tiny cursor
+# recording the last completed page and the log length at that point. Each page costs one
+# append and one cursor rewrite, no matter how far the crawl has gone.
+def load_cursor():
+    if os.path.exists(CURSOR_FILE):
+        with open(CURSOR_FILE, "r") as f:
+            return json.load(f)
+    return {"last_page": START_PAGE - 1, "log_bytes": 0, "count": 0}
+
+def save_cursor(cursor):
+    tmp_path = CURSOR_FILE + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(cursor, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, CURSOR_FILE)
+
+# Load checkpoint if it exists; anything logged after the last cursor write is discarded
+cursor = load_cursor()
+if cursor["last_page"] >= START_PAGE:
+    print(f"Resuming from page {cursor['last_page'] + 1} ({cursor['count']} speeches logged)...")
+
+log = open(LOG_FILE, "r+b" if os.path.exists(LOG_FILE) else "wb")
+log.truncate(cursor["log_bytes"])
+log.seek(cursor["log_bytes"])
 
 start_time = time()
+first_page = cursor["last_page"] + 1
 
-while True:
-    print(f"\nFetching page {current_page}...")
-    url = f"{BASE_URL}?transform=1&order=id&page={current_page},{PAGE_SIZE}"
-    response = requests.get(url)
-
-    if response.status_code != 200:
-        print(f"Request failed: {response.status_code}")
-        break
-
-    page_data = response.json()
-    if isinstance(page_data, dict) and "speeches" in page_data:
-        page_data = page_data["speeches"]
-    elif not isinstance(page_data, list):
-        print("Unexpected response format.")
-        break
-
-    if not page_data:
-        print("No more data returned.")
-        break
-
-    # Filter fields and preview speech
-    for entry in page_data:
-        filtered_entry = {
-            "id": entry["id"],
-            "date": entry.get("date", ""),
-            "title": entry.get("title", ""),
-            "text": entry.get("speaking", ""),
-            "speaker_state": entry.get("speaker_state", ""),
-            "speaker_party": entry.get("speaker_party", "")
-        }
-
-        preview = ' '.join(filtered_entry["text"].split()[:50])
-        print(f"[{filtered_entry['id']}] {filtered_entry['title'][:50]}... — {preview}...\n")
-
-        all_data.append(filtered_entry)
-
-    # Save checkpoint
-    with open(CHECKPOINT_FILE, "w") as f:
-        json.dump({"last_page": current_page, "data": all_data}, f)
-
-    # Estimate remaining time
-    elapsed = time() - start_time
-    pages_done = current_page - START_PAGE + 1
-    avg_time = elapsed / pages_done
-    est_remaining = timedelta(seconds=int(avg_time * 1000 - elapsed))  # guess 1000 pages
-    print(f"Page {current_page} fetched. Estimated remaining: {est_remaining}")
-
-    current_page += 1
-    sleep(0.5)
-
-# Save to JSON
-with open(OUTPUT_JSON, "w") as f:
-    json.dump(all_data, f, indent=2)
-
-# Save to .npz
-np.savez(
-    OUTPUT_NPZ,
-    ids=np.array([d["id"] for d in all_data]),
-    dates=np.array([d["date"] for d in all_data]),
-    titles=np.array([d["title"] for d in all_data]),
-    texts=np.array([d["text"] for d in all_data]),
-    speaker_states=np.array([d["speaker_state"] for d in all_data]),
-    speaker_parties=np.array([d["speaker_party"] for d in all_data]),
-)
+try:
+    for current_page, page_data in iter_pages(first_page):
+        # Filter fields and preview speech
+        lines = []
+        for entry in page_data:
+            filtered_entry = filter_entry(entry)
+
+            preview = ' '.join(filtered_entry["text"].split()[:50])
+            print(f"[{filtered_entry['id']}] {filtered_entry['title'][:50]}... — {preview}...\n")
+
+            lines.append(json.dumps(filtered_entry) + "\n")
+
+        # Save checkpoint: append the page, make it durable, then advance the cursor
+        log.write("".join(lines).encode("utf-8"))
+        log.flush()
+        os.fsync(log.fileno())
+        cursor = {"last_page": current_page, "log_bytes": log.tell(), "count": cursor["count"] + len(lines)}
+        save_cursor(cursor)
+
+        # Estimate remaining time
+        elapsed = time() - start_time
+        pages_done = current_page - first_page + 1
+        avg_time = elapsed / pages_done
+        est_remaining = timedelta(seconds=int(avg_time * 1000 - elapsed))  # guess 1000 pages
+        print(f"Page {current_page} fetched. Estimated remaining: {est_remaining}")
+except RuntimeError as e:
+    # Not the end of the data: keep the log and cursor so a rerun resumes here
+    print(e)
+    print(f"Stopped after page {cursor['last_page']} ({cursor['count']} speeches logged); rerun to resume.")
+    sys.exit(1)
+finally:
+    log.close()
+
+# Only reached after the API returned an empty page
+
+# Stream the completed log into the columnar corpus
+def read_log():
+    with open(LOG_FILE, "r") as f:
+        for line in f:
+            yield json.loads(line)
+
+total = write_corpus(OUTPUT_CORPUS, read_log())
 
 # Cleanup checkpoint
 try:
-    os.remove(CHECKPOINT_FILE)
+    os.remove(CURSOR_FILE)
+    os.remove(LOG_FILE)
 except Exception as e:
     print(f"Could not delete checkpoint: {e}")
 
-print(f"\nSaved speeches to '{OUTPUT_JSON}' and '{OUTPUT_NPZ}'")
+print(f"\nSaved {total} speeches to '{OUTPUT_CORPUS}'")
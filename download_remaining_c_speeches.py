@@ -1,13 +1,11 @@
 import os
+import sys
 import json
-import requests
-import numpy as np
-from time import sleep
+from speech_corpus import write_corpus
+from speech_downloader import iter_pages, filter_entry
 
-BASE_URL = "http://congressionalspeech.lib.uiowa.edu/api.php/speeches"
 CHECKPOINT_FILE = "download_checkpoint.json"
 CHUNK_SIZE = 50000
-PAGE_SIZE = 50
 
 # Initialize
 if os.path.exists(CHECKPOINT_FILE):
@@ -27,67 +25,11 @@ buffer = []
 
 def save_chunk(data, index):
     suffix = str(index).zfill(5)
-    json_file = f"congress_chunk_{suffix}.json"
-    npz_file = f"congress_chunk_{suffix}.npz"
+    corpus_path = f"congress_chunk_{suffix}.corpus"
+    write_corpus(corpus_path, data)
+    print(f"Saved chunk {index} to {corpus_path}")
 
-    with open(json_file, "w") as f:
-        json.dump(data, f, indent=2)
-
-    np.savez(
-        npz_file,
-        ids=np.array([d["id"] for d in data]),
-        dates=np.array([d["date"] for d in data]),
-        titles=np.array([d["title"] for d in data]),
-        texts=np.array([d["text"] for d in data]),
-        speaker_states=np.array([d["speaker_state"] for d in data]),
-        speaker_parties=np.array([d["speaker_party"] for d in data]),
-    )
-
-    print(f"Saved chunk {index} to {json_file} and {npz_file}")
-
-# Download loop
-while True:
-    print(f"\nFetching page {current_page}...")
-    url = f"{BASE_URL}?transform=1&order=id&page={current_page},{PAGE_SIZE}"
-    resp = requests.get(url)
-
-    if resp.status_code != 200:
-        print(f"Failed to fetch page {current_page}: {resp.status_code}")
-        break
-
-    page_data = resp.json()
-    if isinstance(page_data, dict) and "speeches" in page_data:
-        page_data = page_data["speeches"]
-    elif not isinstance(page_data, list):
-        print("Unexpected response format.")
-        break
-
-    if not page_data:
-        print("No more data.")
-        break
-
-    for entry in page_data:
-        speech = {
-            "id": entry["id"],
-            "date": entry.get("date", ""),
-            "title": entry.get("title", ""),
-            "text": entry.get("speaking", ""),
-            "speaker_state": entry.get("speaker_state", ""),
-            "speaker_party": entry.get("speaker_party", "")
-        }
-        buffer.append(speech)
-        total_downloaded += 1
-
-        if total_downloaded % 50 == 0:
-            preview = ' '.join(speech["text"].split()[:20])
-            print(f"[{speech['id']}] {speech['title'][:40]} — {preview}...")
-
-        if len(buffer) == CHUNK_SIZE:
-            save_chunk(buffer, chunk_index)
-            buffer = []
-            chunk_index += 1
-
-    # Save checkpoint
+def save_checkpoint():
     with open(CHECKPOINT_FILE, "w") as f:
         json.dump({
             "last_page": current_page,
@@ -95,8 +37,34 @@ while True:
             "chunk_index": chunk_index
         }, f)
 
-    current_page += 1
-    sleep(0.5)
+# Download loop
+try:
+    for current_page, page_data in iter_pages(current_page):
+        for entry in page_data:
+            speech = filter_entry(entry)
+            buffer.append(speech)
+            total_downloaded += 1
+
+            if total_downloaded % 50 == 0:
+                preview = ' '.join(speech["text"].split()[:20])
+                print(f"[{speech['id']}] {speech['title'][:40]} — {preview}...")
+
+            if len(buffer) == CHUNK_SIZE:
+                save_chunk(buffer, chunk_index)
+                buffer = []
+                chunk_index += 1
+
+        # Save checkpoint
+        save_checkpoint()
+
+except RuntimeError as e:
+    # A page failed for good: keep what was buffered and leave the checkpoint for a resume
+    print(e)
+    if buffer:
+        save_chunk(buffer, chunk_index)
+        chunk_index += 1
+        save_checkpoint()
+    sys.exit(1)
 
 # Save remainder
 if buffer:
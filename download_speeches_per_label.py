@@ -1,7 +1,7 @@
 import os
 import json
-import requests
-from time import sleep
+from keyword_matcher import KeywordMatcher
+from speech_downloader import iter_pages
 
 # Config
 MIN_PER_LABEL = 50
@@ -15,6 +15,7 @@ with open("label_keywords.json", "r") as f:
     label_keywords = json.load(f)
 
 target_labels = list(label_keywords.keys())
+matcher = KeywordMatcher(label_keywords)
 
 # Load existing speeches and counts
 if os.path.exists(INPUT_FILE):
@@ -42,84 +43,59 @@ for label in label_counts:
     print(f"  {label}: {label_counts[label]}")
 
 # Start scraping more
-BASE_URL = "http://congressionalspeech.lib.uiowa.edu/api.php/speeches"
-PAGE_SIZE = 50
 current_page = 1
 empty_page_streak = 0
 
 print("\nAugmenting speeches...")
 
-while any(label_counts[label] < MAX_PER_LABEL for label in target_labels):
-    print(f"\nFetching page {current_page}...")
-
-    url = f"{BASE_URL}?transform=1&order=id&page={current_page},{PAGE_SIZE}"
-    response = requests.get(url)
-
-    if response.status_code != 200:
-        print(f"Request failed: {response.status_code}")
-        break
-
-    speeches = response.json()
-    if isinstance(speeches, dict) and "speeches" in speeches:
-        speeches = speeches["speeches"]
-    elif not isinstance(speeches, list):
-        print("Unexpected response format.")
-        break
-
-    if not speeches:
-        print("No more data returned.")
-        break
-
-    new_matches_found = False
-
-    for entry in speeches:
-        speech_id = entry["id"]
-        if speech_id in existing_ids:
-            continue  # Skip already collected speeches
-
-        speech_text = entry.get("speaking", "").lower()
-        matched_labels = []
-
-        for label in target_labels:
-            if label_counts[label] >= MAX_PER_LABEL:
-                continue
-            keywords = [kw.lower() for kw in label_keywords[label]]
-            if any(kw in speech_text for kw in keywords):
-                matched_labels.append(label)
-
-        if matched_labels:
-            new_labels = []
-            for label in matched_labels:
-                if label_counts[label] < MAX_PER_LABEL:
-                    new_labels.append(label)
-                    label_counts[label] += 1
-
-            if new_labels:
-                sampled_speeches[speech_id] = {
-                    "id": speech_id,
-                    "date": entry.get("date", ""),
-                    "title": entry.get("title", ""),
-                    "text": entry.get("speaking", ""),
-                    "speaker_state": entry.get("speaker_state", ""),
-                    "speaker_party": entry.get("speaker_party", ""),
-                    "labels": new_labels
-                }
-                existing_ids.add(speech_id)
-                print(f" New match (ID {speech_id}): {entry.get('title', '')[:40]} — Labels: {new_labels}")
-                new_matches_found = True
-
-    if new_matches_found:
-        empty_page_streak = 0
-    else:
-        empty_page_streak += 1
-        print(f"  No new matches on page {current_page} (Streak: {empty_page_streak}/{MAX_EMPTY_PAGES})")
-
-    if empty_page_streak >= MAX_EMPTY_PAGES:
-        print("\n Stopping: hit 50 consecutive pages without new matches.")
-        break
-
-    current_page += 1
-    sleep(0.5)
+try:
+    for current_page, speeches in iter_pages(current_page):
+        new_matches_found = False
+
+        for entry in speeches:
+            speech_id = entry["id"]
+            if speech_id in existing_ids:
+                continue  # Skip already collected speeches
+
+            matched_labels = matcher.match(entry.get("speaking", ""))
+
+            if matched_labels:
+                new_labels = []
+                for label in matched_labels:
+                    if label_counts[label] < MAX_PER_LABEL:
+                        new_labels.append(label)
+                        label_counts[label] += 1
+
+                if new_labels:
+                    sampled_speeches[speech_id] = {
+                        "id": speech_id,
+                        "date": entry.get("date", ""),
+                        "title": entry.get("title", ""),
+                        "text": entry.get("speaking", ""),
+                        "speaker_state": entry.get("speaker_state", ""),
+                        "speaker_party": entry.get("speaker_party", ""),
+                        "labels": new_labels
+                    }
+                    existing_ids.add(speech_id)
+                    print(f" New match (ID {speech_id}): {entry.get('title', '')[:40]} — Labels: {new_labels}")
+                    new_matches_found = True
+
+        if new_matches_found:
+            empty_page_streak = 0
+        else:
+            empty_page_streak += 1
+            print(f"  No new matches on page {current_page} (Streak: {empty_page_streak}/{MAX_EMPTY_PAGES})")
+
+        if empty_page_streak >= MAX_EMPTY_PAGES:
+            print("\n Stopping: hit 50 consecutive pages without new matches.")
+            break
+
+        if all(label_counts[label] >= MAX_PER_LABEL for label in target_labels):
+            break
+
+except RuntimeError as e:
+    # The crawl is only a sampling pass, so what was matched so far is still saved
+    print(f"\n Stopping early: {e}")
 
 # Save updated result
 final_samples = list(sampled_speeches.values())
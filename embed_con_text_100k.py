@@ -1,83 +1,57 @@
-import os
-import json
 import numpy as np
-import random
-from dotenv import load_dotenv
-from openai import OpenAI
-import tiktoken
+from embedding_cache import EmbeddingCache
+from embedding_engine import EmbeddingEngine
+from embedding_store import EmbeddingStore, CONGRESS_STORE, CONGRESS_COLUMNS
+from speech_corpus import open_corpus, CORPUS_PATTERNS
+from tokenizer_stage import truncate_batch
 
-# Load API key
-load_dotenv()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
-# Token-safe truncation
-def truncate_to_token_limit(text, max_tokens=8191, model="text-embedding-3-small"):
-    encoding = tiktoken.encoding_for_model(model)
-    tokens = encoding.encode(text)
-    if len(tokens) > max_tokens:
-        tokens = tokens[:max_tokens]
-    return encoding.decode(tokens)
-
-# Get embedding from OpenAI
-def get_embedding(text, model="text-embedding-3-small"):
-    response = client.embeddings.create(
-        input=[text],
-        model=model
-    )
-    return response.data[0].embedding
-
-# Save current chunk to a separate file
-def save_chunk(doc_ids, dates, embeddings, chunk_index, base_name="congress_speech_embeddings_chunk"):
-    out_path = f"{base_name}_{chunk_index}.npz"
-    np.savez(out_path,
-             doc_ids=np.array(doc_ids),
-             dates=np.array(dates),
-             embeddings=np.array(embeddings))
-    print(f"Chunk {chunk_index} saved to {out_path} [{len(doc_ids)} entries]")
+EMBEDDING_MODEL = "text-embedding-3-small"
+STORE_DTYPE = "float16"   # half the disk of float32; similarities move by ~1e-5 (see quantize_store.py)
+engine = EmbeddingEngine(model=EMBEDDING_MODEL, cache=EmbeddingCache(EMBEDDING_MODEL))
 
 # Main logic
 if __name__ == "__main__":
-    with open("congress_speeches_recovered.json", "r") as f:
-        all_documents = json.load(f)
-
-    print(f"Total speeches available: {len(all_documents)}")
+    # Memory-mapped corpus: only the id column is read up front, texts are fetched per chunk
+    corpus = open_corpus()
+    if len(corpus) == 0:
+        raise SystemExit(f"No speech corpus matching {CORPUS_PATTERNS}. Import downloaded speeches first, "
+                         f"e.g. python speech_corpus.py congress_speeches_recovered.json")
+    print(f"Total speeches available: {len(corpus)}")
     sample_size = 100_000
-    sampled_docs = random.sample(all_documents, sample_size)
-    print(f"Randomly sampled {sample_size} congressional speeches.")
+
+    # Embeddings are appended to the store chunk by chunk, so a rerun only tops the sample up
+    store = EmbeddingStore.open_or_create(CONGRESS_STORE, columns=CONGRESS_COLUMNS, dtype=STORE_DTYPE,
+                                          model=EMBEDDING_MODEL)
+    remaining = max(sample_size - len(store), 0)
+    # First row of every id not yet embedded; overlapping corpus parts never yield a speech twice
+    ids, first_rows = np.unique(corpus.ids, return_index=True)
+    candidates = first_rows[~np.isin(ids, store.column("ids"))]
+    sampled_rows = np.random.choice(candidates, min(remaining, len(candidates)), replace=False)
+    print(f"Store already holds {len(store)} embeddings; randomly sampled {len(sampled_rows)} more congressional speeches.")
 
     chunk_size = 1_000  # Change to 5000 if desired
-    doc_ids = []
-    dates = []
-    embeddings = []
     chunk_index = 1
 
-    for i, doc in enumerate(sampled_docs, 1):
-        doc_id = doc["id"]
-        date = doc["date"]
-        text = doc["text"]
-
-        print(f"[{i}/{sample_size}] Processing document ID: {doc_id}")
-
-        truncated = truncate_to_token_limit(text)
-        try:
-            embedding = get_embedding(truncated)
-            print(f"Embedding preview for ID {doc_id}: {embedding[:5]}...")
-        except Exception as e:
-            print(f"Error embedding document ID {doc_id}: {e}")
-            continue
-
-        doc_ids.append(doc_id)
-        dates.append(date)
-        embeddings.append(embedding)
-
-        # Save and reset every chunk_size entries
-        if i % chunk_size == 0:
-            save_chunk(doc_ids, dates, embeddings, chunk_index)
-            doc_ids, dates, embeddings = [], [], []  # Reset for next chunk
-            chunk_index += 1
-
-    # Save any remaining items after final chunk
-    if doc_ids:
-        save_chunk(doc_ids, dates, embeddings, chunk_index)
-
-    print(f"\nFinished embedding {sample_size} documents in {chunk_index} chunks.")
+    for start in range(0, len(sampled_rows), chunk_size):
+        chunk_docs = corpus.take(sampled_rows[start:start + chunk_size])
+        print(f"[{start + 1}-{start + len(chunk_docs)}/{len(sampled_rows)}] Embedding chunk {chunk_index}...")
+
+        truncated, token_counts = truncate_batch([doc["text"] for doc in chunk_docs], model=EMBEDDING_MODEL)
+        chunk_embeddings = engine.embed(truncated, token_counts)
+
+        doc_ids = []
+        dates = []
+        embeddings = []
+        for doc, embedding in zip(chunk_docs, chunk_embeddings):
+            if embedding is None:
+                print(f"Error embedding document ID {doc['id']}")
+                continue
+            doc_ids.append(doc["id"])
+            dates.append(doc["date"])
+            embeddings.append(embedding)
+
+        store.append(embeddings, ids=doc_ids, dates=dates)
+        print(f"Chunk {chunk_index} appended to {CONGRESS_STORE} [{len(doc_ids)} entries, {len(store)} total]")
+        chunk_index += 1
+
+    print(f"\nFinished: {len(store)} embeddings in {CONGRESS_STORE} after {chunk_index - 1} chunks.")
@@ -1,35 +1,18 @@
 import os
 import json
-import time
 import numpy as np
-from dotenv import load_dotenv
-from openai import OpenAI
-import tiktoken
+from embedding_cache import EmbeddingCache
+from embedding_engine import EmbeddingEngine
+from tokenizer_stage import truncate_batch
 
-# Load API key
-load_dotenv()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+EMBEDDING_MODEL = "text-embedding-3-small"
+engine = EmbeddingEngine(model=EMBEDDING_MODEL, cache=EmbeddingCache(EMBEDDING_MODEL))
 
 CHECKPOINT_FILE = "embedding_checkpoint.json"
+CHECKPOINT_EVERY = 500  # docs per engine call between checkpoints
 OUTPUT_JSON = "congress_speeches_labeled_embedded.json"
 OUTPUT_NPZ = "congress_speeches_labeled_embedded.npz"
 
-# Truncate text to token limit
-def truncate_to_token_limit(text, max_tokens=8191, model="text-embedding-3-small"):
-    encoding = tiktoken.encoding_for_model(model)
-    tokens = encoding.encode(text)
-    if len(tokens) > max_tokens:
-        tokens = tokens[:max_tokens]
-    return encoding.decode(tokens)
-
-# Get embedding
-def get_embedding(text, model="text-embedding-3-small"):
-    response = client.embeddings.create(
-        input=[text],
-        model=model
-    )
-    return response.data[0].embedding
-
 # Load existing checkpoint
 def load_checkpoint():
     if os.path.exists(CHECKPOINT_FILE):
@@ -52,25 +35,24 @@ if __name__ == "__main__":
     embedded_ids = set([entry["id"] for entry in results])
     total = len(all_speeches)
 
-    for i, doc in enumerate(all_speeches, 1):
-        doc_id = doc["id"]
-        if doc_id in embedded_ids:
-            continue
+    pending = [doc for doc in all_speeches if doc["id"] not in embedded_ids]
+    print(f"{len(embedded_ids)}/{total} already embedded, {len(pending)} remaining.")
+
+    for start in range(0, len(pending), CHECKPOINT_EVERY):
+        block = pending[start:start + CHECKPOINT_EVERY]
+        print(f"[{start + 1}-{start + len(block)}/{len(pending)}] Embedding {len(block)} speeches...")
 
-        print(f"[{i}/{total}] Embedding ID {doc_id} — {doc['title'][:50]}...")
-        try:
-            truncated = truncate_to_token_limit(doc["text"])
-            embedding = get_embedding(truncated)
-        except Exception as e:
-            print(f"Error on ID {doc_id}: {e}")
-            continue
+        truncated, token_counts = truncate_batch([doc["text"] for doc in block], model=EMBEDDING_MODEL)
+        block_embeddings = engine.embed(truncated, token_counts)
 
-        doc["embedding"] = embedding
-        results.append(doc)
+        for doc, embedding in zip(block, block_embeddings):
+            if embedding is None:
+                print(f"Error on ID {doc['id']}")
+                continue
+            doc["embedding"] = embedding
+            results.append(doc)
 
-        if len(results) % 50 == 0:
-            save_checkpoint(results)
-            time.sleep(1)
+        save_checkpoint(results)
 
     # Final save
     with open(OUTPUT_JSON, "w") as f:
@@ -1,36 +1,16 @@
-import os
 import json
 import numpy as np
-from dotenv import load_dotenv
-from openai import OpenAI
-import tiktoken
+from embedding_cache import EmbeddingCache
+from embedding_engine import EmbeddingEngine
+from tokenizer_stage import truncate_batch
+from speech_dataset import save_dataset
 
-# Load .env file for API key
-load_dotenv()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
-# Token-safe truncation
-def truncate_to_token_limit(text, max_tokens=8191, model="text-embedding-ada-002"):
-    encoding = tiktoken.encoding_for_model(model)
-    tokens = encoding.encode(text)
-    if len(tokens) > max_tokens:
-        tokens = tokens[:max_tokens]
-    return encoding.decode(tokens)
-
-# Get embedding from OpenAI
-def get_embedding(text, model="text-embedding-ada-002"):
-    response = client.embeddings.create(
-        input=[text],
-        model=model
-    )
-    return response.data[0].embedding
+EMBEDDING_MODEL = "text-embedding-ada-002"
+engine = EmbeddingEngine(model=EMBEDDING_MODEL, cache=EmbeddingCache(EMBEDDING_MODEL))
 
 # Save metadata and embeddings to .npz file
 def save_metadata_and_embeddings(doc_names, dates, embeddings, out_path="speech_embeddings.npz"):
-    np.savez(out_path,
-             doc_names=np.array(doc_names),
-             dates=np.array(dates),
-             embeddings=np.array(embeddings))
+    save_dataset(out_path, doc_names=doc_names, dates=dates, embeddings=embeddings, model=np.array(EMBEDDING_MODEL))
     print(f"\nSaved embeddings to {out_path}")
 
 # Main logic
@@ -38,28 +18,20 @@ if __name__ == "__main__":
     with open("presidential_speeches.json", "r") as f:
         documents = json.load(f)
 
+    total = len(documents)
+    print(f"Embedding {total} documents...")
+    truncated, token_counts = truncate_batch([doc["transcript"] for doc in documents], model=EMBEDDING_MODEL)
+    all_embeddings = engine.embed(truncated, token_counts)
+
     doc_names = []
     dates = []
     embeddings = []
-
-    total = len(documents)
-    for i, doc in enumerate(documents, 1):
-        name = doc["doc_name"]
-        date = doc["date"]
-        transcript = doc["transcript"]
-
-        print(f"[{i}/{total}] Processing document: {name}")
-
-        truncated = truncate_to_token_limit(transcript)
-        try:
-            embedding = get_embedding(truncated)
-            print(f"Embedding preview for '{name[:30]}...': {embedding[:5]}...")
-        except Exception as e:
-            print(f"Error embedding '{name}': {e}")
+    for doc, embedding in zip(documents, all_embeddings):
+        if embedding is None:
+            print(f"Error embedding '{doc['doc_name']}'")
             continue
-
-        doc_names.append(name)
-        dates.append(date)
+        doc_names.append(doc["doc_name"])
+        dates.append(doc["date"])
         embeddings.append(embedding)
 
     print(f"\nFinished embedding {len(embeddings)} out of {total} documents.")
@@ -0,0 +1,101 @@
+import os
+import hashlib
+import numpy as np
+
+CACHE_DIR = "embedding_cache"
+DIM = 1536
+
+
+# Content address of an embedding: model name plus the exact (truncated) text sent to the API
+def cache_key(model, text):
+    digest = hashlib.blake2b(f"{model}\0{text}".encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+# Persistent on-disk embedding cache for one model.
+# vectors.f32 is an append-only float32 matrix read through a memmap, keys.u64 holds the
+# key of each row in the same order; the key -> row index is rebuilt from it on open.
+class EmbeddingCache:
+    def __init__(self, model, cache_dir=CACHE_DIR, dim=DIM):
+        self.model = model
+        self.dim = dim
+        self.dir = os.path.join(cache_dir, model)
+        os.makedirs(self.dir, exist_ok=True)
+        self.vectors_path = os.path.join(self.dir, "vectors.f32")
+        self.keys_path = os.path.join(self.dir, "keys.u64")
+
+        keys = np.fromfile(self.keys_path, dtype=np.uint64) if os.path.exists(self.keys_path) else np.empty(0, np.uint64)
+        vector_rows = os.path.getsize(self.vectors_path) // (4 * dim) if os.path.exists(self.vectors_path) else 0
+
+        # A crash between the two appends can leave the files out of step; keep the common prefix
+        rows = min(len(keys), vector_rows)
+        if rows != len(keys) or rows != vector_rows:
+            self._truncate(rows)
+            keys = keys[:rows]
+
+        self.index = {int(k): row for row, k in enumerate(keys)}
+        self.rows = rows
+        self._vectors = None
+
+    def _truncate(self, rows):
+        with open(self.keys_path, "ab") as f:
+            f.truncate(rows * 8)
+        with open(self.vectors_path, "ab") as f:
+            f.truncate(rows * 4 * self.dim)
+
+    @property
+    def vectors(self):
+        if self._vectors is None or len(self._vectors) != self.rows:
+            if self.rows == 0:
+                return np.empty((0, self.dim), dtype=np.float32)
+            self._vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(self.rows, self.dim))
+        return self._vectors
+
+    def __len__(self):
+        return self.rows
+
+    def __contains__(self, text):
+        return cache_key(self.model, text) in self.index
+
+    # Look up many texts at once; returns (embeddings with None for misses, indices of misses).
+    # Hits come back as plain lists, the same type the API path returns, so callers can json.dump them.
+    def get_many(self, texts):
+        found = [None] * len(texts)
+        missing = []
+        for i, text in enumerate(texts):
+            row = self.index.get(cache_key(self.model, text))
+            if row is None:
+                missing.append(i)
+            else:
+                found[i] = self.vectors[row].tolist()
+        return found, missing
+
+    # Append new embeddings; texts already cached (or repeated within the call) are skipped
+    def put_many(self, texts, embeddings):
+        new_keys = []
+        new_vectors = []
+        for text, embedding in zip(texts, embeddings):
+            if embedding is None:
+                continue
+            key = cache_key(self.model, text)
+            if key in self.index:
+                continue
+            self.index[key] = self.rows + len(new_keys)
+            new_keys.append(key)
+            new_vectors.append(embedding)
+
+        if not new_keys:
+            return 0
+
+        # Vectors go first so a crash never leaves a key pointing past the end of the matrix
+        with open(self.vectors_path, "ab") as f:
+            np.asarray(new_vectors, dtype=np.float32).reshape(-1, self.dim).tofile(f)
+            f.flush()
+            os.fsync(f.fileno())
+        with open(self.keys_path, "ab") as f:
+            np.asarray(new_keys, dtype=np.uint64).tofile(f)
+            f.flush()
+            os.fsync(f.fileno())
+
+        self.rows += len(new_keys)
+        return len(new_keys)
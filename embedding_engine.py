@@ -0,0 +1,174 @@
+import os
+import time
+import random
+import asyncio
+import argparse
+from dotenv import load_dotenv
+from openai import AsyncOpenAI, RateLimitError, APIConnectionError, InternalServerError
+
+# Load API key
+load_dotenv()
+
+DEFAULT_MODEL = "text-embedding-3-small"
+MAX_TOKENS_PER_REQUEST = 300_000   # API limit on summed input tokens per embeddings request
+MAX_INPUTS_PER_REQUEST = 2048      # API limit on inputs per embeddings request
+CONCURRENCY = 8
+MAX_RETRIES = 6
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 60.0
+
+RETRYABLE_ERRORS = (RateLimitError, APIConnectionError, InternalServerError)
+
+
+# Group consecutive texts into requests that stay under the token and input budgets.
+# Without exact token counts, character length is used as a safe upper bound.
+def pack_batches(texts, token_counts=None, max_tokens=MAX_TOKENS_PER_REQUEST, max_inputs=MAX_INPUTS_PER_REQUEST):
+    if token_counts is None:
+        token_counts = [len(text) for text in texts]
+
+    batches = []
+    current = []
+    current_tokens = 0
+    for i, n_tokens in enumerate(token_counts):
+        n_tokens = max(int(n_tokens), 1)
+        if current and (current_tokens + n_tokens > max_tokens or len(current) >= max_inputs):
+            batches.append(current)
+            current = []
+            current_tokens = 0
+        current.append(i)
+        current_tokens += n_tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+# Honor the server's Retry-After header when present, else exponential backoff with jitter
+def backoff_delay(attempt, error=None):
+    response = getattr(error, "response", None)
+    if response is not None:
+        retry_after = response.headers.get("retry-after")
+        if retry_after:
+            try:
+                return min(float(retry_after), BACKOFF_MAX)
+            except ValueError:
+                pass
+    delay = min(BACKOFF_BASE * (2 ** attempt), BACKOFF_MAX)
+    return delay * (0.5 + random.random() / 2)
+
+
+class EmbeddingEngine:
+    def __init__(self, model=DEFAULT_MODEL, api_key=None, base_url=None,
+                 max_tokens_per_request=MAX_TOKENS_PER_REQUEST, max_inputs_per_request=MAX_INPUTS_PER_REQUEST,
+                 concurrency=CONCURRENCY, max_retries=MAX_RETRIES, cache=None, verbose=True):
+        self.model = model
+        self.cache = cache
+        self.api_key = api_key or os.getenv("OPENAI_API_KEY")
+        self.base_url = base_url or os.getenv("EMBEDDING_BASE_URL")
+        self.max_tokens_per_request = max_tokens_per_request
+        self.max_inputs_per_request = max_inputs_per_request
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.verbose = verbose
+        self.last_stats = {}
+
+    async def _embed_batch(self, client, semaphore, texts, stats):
+        async with semaphore:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    response = await client.embeddings.create(input=texts, model=self.model)
+                    stats["requests"] += 1
+                    ordered = sorted(response.data, key=lambda d: d.index)
+                    return [d.embedding for d in ordered]
+                except RETRYABLE_ERRORS as e:
+                    stats["retries"] += 1
+                    if attempt == self.max_retries:
+                        print(f"Giving up on batch of {len(texts)} after {attempt + 1} attempts: {e}")
+                        break
+                    delay = backoff_delay(attempt, e)
+                    if self.verbose:
+                        print(f"{type(e).__name__} on batch of {len(texts)}, retrying in {delay:.2f}s...")
+                    await asyncio.sleep(delay)
+                except Exception as e:
+                    print(f"Error embedding batch of {len(texts)}: {e}")
+                    break
+        stats["failed"] += len(texts)
+        return [None] * len(texts)
+
+    # Embed texts (already truncated) keeping up to `concurrency` requests in flight.
+    # Texts found in the cache are served from disk and only the misses are sent to the API.
+    # Returns one embedding per input, or None where the request ultimately failed.
+    async def aembed(self, texts, token_counts=None):
+        texts = list(texts)
+        if self.cache is not None:
+            embeddings, pending = self.cache.get_many(texts)
+        else:
+            embeddings, pending = [None] * len(texts), list(range(len(texts)))
+
+        pending_texts = [texts[i] for i in pending]
+        pending_counts = [token_counts[i] for i in pending] if token_counts is not None else None
+        batches = pack_batches(pending_texts, pending_counts, self.max_tokens_per_request, self.max_inputs_per_request)
+        stats = {"docs": len(texts), "cached": len(texts) - len(pending),
+                 "tokens": sum(pending_counts) if pending_counts is not None else None,
+                 "requests": 0, "retries": 0, "failed": 0}
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        start = time.perf_counter()
+        if batches:
+            async with AsyncOpenAI(api_key=self.api_key, base_url=self.base_url, max_retries=0) as client:
+                results = await asyncio.gather(*[
+                    self._embed_batch(client, semaphore, [pending_texts[i] for i in batch], stats)
+                    for batch in batches
+                ])
+            for batch, batch_embeddings in zip(batches, results):
+                for i, embedding in zip(batch, batch_embeddings):
+                    embeddings[pending[i]] = embedding
+            if self.cache is not None:
+                self.cache.put_many(pending_texts, [embeddings[i] for i in pending])
+        elapsed = time.perf_counter() - start
+
+        stats["seconds"] = elapsed
+        stats["docs_per_sec"] = len(texts) / elapsed if elapsed > 0 else 0.0
+        self.last_stats = stats
+        if self.verbose:
+            tokens = f", {stats['tokens']:,} tokens" if stats["tokens"] is not None else ""
+            print(f"Embedded {len(texts) - stats['failed']}/{len(texts)} docs ({stats['cached']} from cache) "
+                  f"in {stats['requests']} requests ({stats['retries']} retries{tokens}) — "
+                  f"{elapsed:.2f}s, {stats['docs_per_sec']:.1f} docs/sec")
+        return embeddings
+
+    def embed(self, texts, token_counts=None):
+        return asyncio.run(self.aembed(texts, token_counts))
+
+
+# Benchmark one-doc-per-request sequential calls against the batched engine on the stub server
+if __name__ == "__main__":
+    from stub_embedding_server import start_stub_server
+
+    parser = argparse.ArgumentParser(description="Benchmark the embedding engine against a local stub server.")
+    parser.add_argument("--docs", type=int, default=2000)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    parser.add_argument("--max-inputs", type=int, default=256)
+    parser.add_argument("--rate-limit-prob", type=float, default=0.05)
+    args = parser.parse_args()
+
+    server = start_stub_server(latency=args.latency, rate_limit_prob=args.rate_limit_prob)
+    texts = [f"Mr. Speaker, speech number {i}. " * 40 for i in range(args.docs)]
+
+    baseline_docs = min(args.docs, 50)
+    baseline = EmbeddingEngine(base_url=server.base_url, api_key="stub", max_inputs_per_request=1,
+                               concurrency=1, verbose=False)
+    baseline.embed(texts[:baseline_docs])
+    base_rate = baseline.last_stats["docs_per_sec"]
+    print(f"Baseline (1 doc/request, sequential): {base_rate:.1f} docs/sec on {baseline_docs} docs")
+
+    engine = EmbeddingEngine(base_url=server.base_url, api_key="stub", max_inputs_per_request=args.max_inputs,
+                             concurrency=args.concurrency, verbose=False)
+    embeddings = engine.embed(texts)
+    stats = engine.last_stats
+    print(f"Engine (batched, {args.concurrency} in flight): {stats['docs_per_sec']:.1f} docs/sec on {args.docs} docs "
+          f"in {stats['requests']} requests, {stats['retries']} retries, {stats['failed']} failed")
+    if base_rate > 0:
+        print(f"Speedup: {stats['docs_per_sec'] / base_rate:.1f}x")
+
+    server.shutdown()
@@ -0,0 +1,260 @@
+import os
+import json
+import glob
+import argparse
+import numpy as np
+from speech_dataset import load_dataset
+
+DIM = 1536
+CONGRESS_STORE = "congress_speech_embeddings_100k"
+CONGRESS_COLUMNS = {"ids": "int64", "dates": "datetime64[D]"}
+CONGRESS_MODEL = "text-embedding-3-small"
+EMBEDDING_DTYPES = ("float32", "float16", "int8")
+
+
+# Compact encodings for the stored matrix: float16 halves it, int8 quarters it with one
+# float32 scale per vector (max |x| / 127), which keeps each vector's direction accurate.
+# Returns (codes, scales); scales is None for the float types.
+def quantize(embeddings, dtype):
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    if dtype == "int8":
+        scales = np.abs(embeddings).max(axis=1) / 127
+        scales[scales == 0] = 1.0
+        codes = np.rint(embeddings / scales[:, None]).astype(np.int8)
+        return codes, scales.astype(np.float32)
+    return embeddings.astype(dtype), None
+
+
+# Read-only float32 view over quantized rows: indexing dequantizes only the rows asked for,
+# so block-wise consumers written against the float32 memmap work unchanged
+class QuantizedEmbeddings:
+    def __init__(self, codes, scales=None):
+        self.codes = codes
+        self.scales = scales
+        self.shape = codes.shape
+        self.dtype = np.dtype(np.float32)
+        self.ndim = 2
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __getitem__(self, index):
+        values = np.asarray(self.codes[index], dtype=np.float32)
+        if self.scales is None:
+            return values
+        rows = index[0] if isinstance(index, tuple) else index
+        scales = np.asarray(self.scales[rows], dtype=np.float32)
+        if values.ndim > scales.ndim:
+            scales = scales[..., None]
+        return values * scales
+
+    def __array__(self, dtype=None, copy=None):
+        values = self[:]
+        return values if dtype is None else values.astype(dtype)
+
+
+# Append-only embedding store: a directory holding one raw float32 matrix plus one raw
+# file per sidecar column, all opened as memmaps. meta.json records the committed row
+# count and is replaced atomically after every append, so readers never see a torn write.
+class EmbeddingStore:
+    def __init__(self, path, mode="r"):
+        self.path = path
+        self.mode = mode
+        with open(os.path.join(path, "meta.json"), "r") as f:
+            meta = json.load(f)
+        self.dim = meta["dim"]
+        self.columns = meta["columns"]
+        self.rows = meta["rows"]
+        self.dtype = meta.get("dtype", "float32")
+        self.model = meta.get("model")  # embedding model; None for stores written before it was recorded
+
+        if mode == "a":
+            # Drop anything written past the last commit
+            self._truncate_to(self.rows)
+
+    @classmethod
+    def create(cls, path, dim=DIM, columns=None, dtype="float32", model=None):
+        if dtype not in EMBEDDING_DTYPES:
+            raise ValueError(f"dtype must be one of {EMBEDDING_DTYPES}, got {dtype!r}")
+        os.makedirs(path, exist_ok=True)
+        columns = dict(columns or {})
+        names = ["embeddings", *columns] + (["embedding_scales"] if dtype == "int8" else [])
+        for name in names:
+            open(os.path.join(path, f"{name}.bin"), "wb").close()
+        cls._write_meta(path, {"dim": dim, "columns": columns, "rows": 0, "dtype": dtype, "model": model})
+        return cls(path, mode="a")
+
+    # dtype only applies to a new store; an existing one keeps the encoding it was created with.
+    # Vectors from a different embedding model never go into an existing store.
+    @classmethod
+    def open_or_create(cls, path, dim=DIM, columns=None, dtype="float32", model=None):
+        if not os.path.exists(os.path.join(path, "meta.json")):
+            return cls.create(path, dim, columns, dtype, model)
+        store = cls(path, mode="a")
+        if model is not None:
+            if store.model is None:
+                store.set_model(model)
+            check_model(store.model, model, path, "the embedding model")
+        return store
+
+    def _meta(self):
+        return {"dim": self.dim, "columns": self.columns, "rows": self.rows, "dtype": self.dtype, "model": self.model}
+
+    # Record the model of a store written before the model was tracked
+    def set_model(self, model):
+        self.model = model
+        self._write_meta(self.path, self._meta())
+
+    @staticmethod
+    def _write_meta(path, meta):
+        tmp_path = os.path.join(path, "meta.json.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(meta, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, os.path.join(path, "meta.json"))
+
+    def _file(self, name):
+        return os.path.join(self.path, f"{name}.bin")
+
+    def _truncate_to(self, rows):
+        with open(self._file("embeddings"), "ab") as f:
+            f.truncate(rows * self.dim * np.dtype(self.dtype).itemsize)
+        if self.dtype == "int8":
+            with open(self._file("embedding_scales"), "ab") as f:
+                f.truncate(rows * 4)
+        for name, dtype in self.columns.items():
+            with open(self._file(name), "ab") as f:
+                f.truncate(rows * np.dtype(dtype).itemsize)
+
+    def __len__(self):
+        return self.rows
+
+    def append(self, embeddings, **columns):
+        if self.mode != "a":
+            raise ValueError("Store opened read-only; use mode='a' to append.")
+        if set(columns) != set(self.columns):
+            raise ValueError(f"Expected columns {sorted(self.columns)}, got {sorted(columns)}")
+
+        embeddings = np.asarray(embeddings, dtype=np.float32).reshape(-1, self.dim)
+        n = len(embeddings)
+        if n == 0:
+            return 0
+        codes, scales = quantize(embeddings, self.dtype)
+
+        arrays = {}
+        for name, dtype in self.columns.items():
+            arrays[name] = np.asarray(columns[name], dtype=dtype)
+            if len(arrays[name]) != n:
+                raise ValueError(f"Column '{name}' has {len(arrays[name])} rows, expected {n}")
+
+        if scales is not None:
+            arrays["embedding_scales"] = scales
+        for name, array in [("embeddings", codes), *arrays.items()]:
+            with open(self._file(name), "ab") as f:
+                array.tofile(f)
+                f.flush()
+                os.fsync(f.fileno())
+
+        self.rows += n
+        self._write_meta(self.path, self._meta())
+        return n
+
+    # Views over the committed rows: the float32 memmap itself, or a lazily dequantizing
+    # float32 view for float16/int8 stores
+    @property
+    def embeddings(self):
+        if self.rows == 0:
+            return np.empty((0, self.dim), dtype=np.float32)
+        if self.dtype == "float32":
+            return self.raw_embeddings
+        scales = None
+        if self.dtype == "int8":
+            scales = np.memmap(self._file("embedding_scales"), dtype=np.float32, mode="r", shape=(self.rows,))
+        return QuantizedEmbeddings(self.raw_embeddings, scales)
+
+    # The stored codes as written, without dequantization
+    @property
+    def raw_embeddings(self):
+        if self.rows == 0:
+            return np.empty((0, self.dim), dtype=self.dtype)
+        return np.memmap(self._file("embeddings"), dtype=self.dtype, mode="r", shape=(self.rows, self.dim))
+
+    def column(self, name):
+        dtype = np.dtype(self.columns[name])
+        if self.rows == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(self._file(name), dtype=dtype, mode="r", shape=(self.rows,))
+
+    def __getitem__(self, name):
+        return self.embeddings if name == "embeddings" else self.column(name)
+
+    # Yield (start, stop) row ranges so consumers can stream the matrix in bounded memory
+    def iter_blocks(self, block_size=10_000):
+        for start in range(0, self.rows, block_size):
+            yield start, min(start + block_size, self.rows)
+
+
+def open_store(path):
+    return EmbeddingStore(path, mode="r")
+
+
+# Refuse to compare vectors from different embedding models: their cosine similarities are
+# meaningless. A file that records its model never pairs with one that does not.
+def check_model(model, other_model, name, other_name):
+    if model == other_model:
+        return
+    message = (f"{name} ({model or 'no recorded model'}) and {other_name} ({other_model or 'no recorded model'}) "
+               f"come from different embedding models; cosine similarities across models are meaningless")
+    if model is None or other_model is None:
+        message += ("; record the model of an older file with: python embedding_store.py --store STORE --model MODEL, "
+                    "python speech_dataset.py --model MODEL FILE.npz, or for centroids {\"model\": MODEL} "
+                    "in the CENTROIDS.json next to CENTROIDS.npz")
+    raise ValueError(message)
+
+
+# Embedding model recorded in a store's meta.json or a dataset npz's "model" member (else None)
+def embedding_model(source):
+    if os.path.isdir(source):
+        return open_store(source).model
+    data = load_dataset(source, mmap_mode="r")
+    return str(data["model"]) if "model" in data else None
+
+
+# (embeddings, ids, dates) from an embedding store directory or a typed dataset npz
+# (see speech_dataset.py); dates is None for files without them. Embeddings stay memory-mapped.
+def open_embeddings(source):
+    if os.path.isdir(source):
+        store = open_store(source)
+        return store.embeddings, np.asarray(store.column("ids")), np.asarray(store.column("dates"))
+    data = load_dataset(source, mmap_mode="r")
+    dates = data.dates if "dates" in data else None
+    return data["embeddings"], np.asarray(data.ids), dates
+
+
+# Stream legacy congress_speech_embeddings_chunk_*.npz files into a store, one chunk at a time
+def import_npz_chunks(pattern, store_path=CONGRESS_STORE, model=CONGRESS_MODEL):
+    chunk_files = sorted(glob.glob(pattern), key=lambda p: int(p.rsplit("_", 1)[1].split(".")[0]))
+    print(f"Found {len(chunk_files)} chunk files.")
+
+    store = EmbeddingStore.open_or_create(store_path, columns=CONGRESS_COLUMNS, model=model)
+    for path in chunk_files:
+        data = np.load(path, allow_pickle=True)
+        ids = data["doc_ids"].astype(np.int64)
+        keep = ~np.isin(ids, store.column("ids"))
+        store.append(np.stack(data["embeddings"][keep]) if keep.any() else [],
+                     ids=ids[keep],
+                     dates=data["dates"][keep].astype("datetime64[D]"))
+        print(f"Imported {path} [{int(keep.sum())} new entries, {len(store)} total]")
+    return store
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import legacy embedding chunk files into an append-only store.")
+    parser.add_argument("--pattern", default="congress_speech_embeddings_chunk_*.npz")
+    parser.add_argument("--store", default=CONGRESS_STORE)
+    parser.add_argument("--model", default=CONGRESS_MODEL, help="embedding model of the chunks; also tags an untagged store")
+    args = parser.parse_args()
+
+    store = import_npz_chunks(args.pattern, args.store, args.model)
+    print(f"Store '{args.store}' holds {len(store)} {store.model} embeddings.")
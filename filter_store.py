@@ -0,0 +1,104 @@
+import json
+import argparse
+import numpy as np
+from embedding_store import EmbeddingStore, open_store, CONGRESS_STORE
+
+BLOCK_SIZE = 10_000
+
+
+# Speech ids from a file: a JSON list of speeches (or of ids), an .npy/.npz id array, or one id per line
+def read_ids(path):
+    if path.endswith(".npy"):
+        return np.load(path).astype(np.int64)
+    if path.endswith(".npz"):
+        return np.load(path)["ids"].astype(np.int64)
+    if path.endswith(".json"):
+        with open(path, "r") as f:
+            items = json.load(f)
+        return np.array([item["id"] if isinstance(item, dict) else item for item in items], dtype=np.int64)
+    return np.loadtxt(path, dtype=np.int64, ndmin=1)
+
+
+# Ids of every corpus speech by a speaker of the given parties, matched on the dictionary codes
+def party_ids(corpus, parties):
+    ids = []
+    for part in corpus.parts:
+        codes = np.flatnonzero(np.isin(part.vocab["speaker_party"], parties))
+        ids.append(np.asarray(part.ids)[np.isin(part.codes["speaker_party"], codes)])
+    return np.concatenate(ids) if ids else np.empty(0, dtype=np.int64)
+
+
+# Ids carrying any of the given labels in a label-mask npz (ids, masks, labels)
+def label_ids(masks_path, labels):
+    data = np.load(masks_path)
+    names = list(data["labels"])
+    missing = [label for label in labels if label not in names]
+    if missing:
+        raise ValueError(f"Unknown labels {missing}; {masks_path} has {names}")
+    wanted = np.uint32(sum(1 << names.index(label) for label in labels))
+    return data["ids"][(data["masks"] & wanted) != 0]
+
+
+# Boolean row mask over a store; every criterion is one vectorized pass over an id or date column
+def build_mask(store, include_ids=None, exclude_ids=None, start_date=None, end_date=None,
+               parties=None, labels=None, masks_path=None, corpus=None):
+    ids = np.asarray(store.column("ids"))
+    mask = np.ones(len(ids), dtype=bool)
+    if include_ids is not None:
+        mask &= np.isin(ids, include_ids)
+    if exclude_ids is not None:
+        mask &= ~np.isin(ids, exclude_ids)
+    if start_date or end_date:
+        dates = np.asarray(store.column("dates"))
+        if start_date:
+            mask &= dates >= np.datetime64(start_date, "D")
+        if end_date:
+            mask &= dates <= np.datetime64(end_date, "D")
+    if parties:
+        mask &= np.isin(ids, party_ids(corpus, parties))
+    if labels:
+        mask &= np.isin(ids, label_ids(masks_path, labels))
+    return mask
+
+
+# Stream the selected rows into a new store with the same columns and encoding, one block at a time
+def write_filtered(store, mask, output_path, block_size=BLOCK_SIZE):
+    output = EmbeddingStore.create(output_path, store.dim, store.columns, store.dtype, store.model)
+    embeddings = store.embeddings
+    columns = {name: store.column(name) for name in store.columns}
+    for start, stop in store.iter_blocks(block_size):
+        keep = np.flatnonzero(mask[start:stop]) + start
+        if len(keep):
+            output.append(embeddings[keep], **{name: column[keep] for name, column in columns.items()})
+    return output
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write the subset of an embedding store that matches the given filters.")
+    parser.add_argument("--source", default=CONGRESS_STORE)
+    parser.add_argument("--output", required=True)
+    parser.add_argument("--include-ids", help="keep only these ids (.json/.npy/.npz/text)")
+    parser.add_argument("--exclude-ids", help="drop these ids (.json/.npy/.npz/text)")
+    parser.add_argument("--start-date", help="YYYY-MM-DD, inclusive")
+    parser.add_argument("--end-date", help="YYYY-MM-DD, inclusive")
+    parser.add_argument("--party", nargs="+", help="keep speeches by speakers of these parties (from the corpus)")
+    parser.add_argument("--label", nargs="+", help="keep speeches carrying any of these labels")
+    parser.add_argument("--masks", default="keyword_label_masks.npz", help="label-mask npz used by --label")
+    args = parser.parse_args()
+
+    corpus = None
+    if args.party:
+        from speech_corpus import open_corpus
+        corpus = open_corpus()
+
+    store = open_store(args.source)
+    mask = build_mask(store,
+                      include_ids=read_ids(args.include_ids) if args.include_ids else None,
+                      exclude_ids=read_ids(args.exclude_ids) if args.exclude_ids else None,
+                      start_date=args.start_date, end_date=args.end_date,
+                      parties=args.party, labels=args.label, masks_path=args.masks, corpus=corpus)
+    output = write_filtered(store, mask, args.output)
+
+    print(f"Original: {len(store)}")
+    print(f"Removed: {len(store) - len(output)}")
+    print(f"Remaining: {len(output)}")
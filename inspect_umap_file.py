@@ -1,15 +1,15 @@
-import numpy as np
+from speech_dataset import load_dataset
 
-data = np.load("umap_embeddings.npz", allow_pickle=True)
+data = load_dataset("umap_embeddings.npz", mmap_mode="r")
 
 # Show available arrays
-print("Keys:", list(data.keys()))
+print("Keys:", data.files)
 
-# Peek at shapes and example values
-print("doc_names shape:", data["doc_names"].shape)
-print("dates shape:", data["dates"].shape)
-print("umap_2d shape:", data["umap_2d"].shape)
+# Peek at shapes, dtypes and example values
+for name in data.files:
+    print(f"{name}: {data[name].dtype} {data[name].shape}")
 
 # Peek at first few rows
-print("First doc name:", data["doc_names"][0])
+print("First id:", data.ids[0])
+print("First date:", data.dates[0])
 print("First UMAP vector:", data["umap_2d"][0])
@@ -0,0 +1,118 @@
+import re
+import json
+import time
+import argparse
+
+LABEL_KEYWORDS_FILE = "label_keywords.json"
+
+
+# Factor a set of keywords into a trie-shaped regex ("trade(?: agreement)?|tariff|...") so the
+# engine walks shared prefixes once instead of trying every alternative at each position
+def trie_regex(words):
+    trie = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = True
+
+    def build(node):
+        alternatives = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch != ""]
+        if not alternatives:
+            return ""
+        body = "(?:" + "|".join(alternatives) + ")" if len(alternatives) > 1 else alternatives[0]
+        if "" in node:
+            body = "(?:" + body + ")?"
+        return body
+
+    return build(trie)
+
+
+# Matches all 22 topic labels against a speech in a single regex pass.
+# With whole_words=True keywords only match on word boundaries ("tariff" does not hit "tariffs");
+# whole_words=False reproduces the old plain substring test.
+class KeywordMatcher:
+    def __init__(self, label_keywords, whole_words=True):
+        self.labels = list(label_keywords)
+        self.whole_words = whole_words
+
+        keyword_bits = {}
+        for i, label in enumerate(self.labels):
+            for kw in label_keywords[label]:
+                kw = kw.lower()
+                keyword_bits[kw] = keyword_bits.get(kw, 0) | (1 << i)
+
+        # The zero-width lookahead lets matches overlap ("ai" inside "said" when whole_words is off)
+        left, right = (r"(?<!\w)", r"(?!\w)") if whole_words else ("", "")
+        # Texts are lowercased up front, which is much cheaper than matching with re.IGNORECASE
+        self.pattern = re.compile("(?=" + left + "(" + trie_regex(keyword_bits) + ")" + right + ")")
+
+        # The trie reports only one keyword per start position ("trade agreement", not "trade"),
+        # so each keyword also carries the bits of the keywords it contains
+        self.bits = {}
+        for kw in keyword_bits:
+            bits = 0
+            for other, other_bits in keyword_bits.items():
+                if re.search(left + re.escape(other) + right, kw):
+                    bits |= other_bits
+            self.bits[kw] = bits
+
+    @classmethod
+    def from_file(cls, path=LABEL_KEYWORDS_FILE, whole_words=True):
+        with open(path, "r") as f:
+            return cls(json.load(f), whole_words)
+
+    # Bitmask with bit i set when label i has a keyword in the text
+    def match_mask(self, text):
+        mask = 0
+        for kw in set(self.pattern.findall(text.lower())):
+            mask |= self.bits[kw]
+        return mask
+
+    def mask_to_labels(self, mask):
+        return [label for i, label in enumerate(self.labels) if mask >> i & 1]
+
+    # Labels matched in the text, in label_keywords.json order
+    def match(self, text):
+        return self.mask_to_labels(self.match_mask(text))
+
+
+# The per-label loop download_speeches_per_label.py used before the matcher
+def match_loop(text, label_keywords):
+    speech_text = text.lower()
+    matched_labels = []
+    for label in label_keywords:
+        keywords = [kw.lower() for kw in label_keywords[label]]
+        if any(kw in speech_text for kw in keywords):
+            matched_labels.append(label)
+    return matched_labels
+
+
+# Benchmark the matcher against the old loop on the sampled labeled speeches
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the compiled keyword matcher against the per-label loop.")
+    parser.add_argument("--input", default="congress_sampled_labeled_speeches.json")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with open(LABEL_KEYWORDS_FILE, "r") as f:
+        label_keywords = json.load(f)
+    with open(args.input, "r") as f:
+        texts = [speech["text"] for speech in json.load(f)]
+    print(f"{len(texts)} speeches, {len(label_keywords)} labels, "
+          f"{sum(len(v) for v in label_keywords.values())} keywords")
+
+    def bench(name, fn):
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            results = [fn(text) for text in texts]
+        elapsed = (time.perf_counter() - start) / args.repeat
+        print(f"{name:<28} {elapsed * 1000:8.1f} ms  ({len(texts) / elapsed:,.0f} speeches/sec)")
+        return results
+
+    baseline = bench("per-label loop", lambda text: match_loop(text, label_keywords))
+    substring = bench("matcher (substring)", KeywordMatcher(label_keywords, whole_words=False).match)
+    whole = bench("matcher (whole words)", KeywordMatcher(label_keywords, whole_words=True).match)
+
+    print(f"Substring matcher agrees with loop on {sum(a == b for a, b in zip(baseline, substring))}/{len(texts)} speeches")
+    print(f"Whole-word matcher agrees with loop on {sum(a == b for a, b in zip(baseline, whole))}/{len(texts)} speeches")
@@ -1,127 +1,77 @@
 import os
-import time
+import sys
 import json
-from dotenv import load_dotenv
-from openai import OpenAI
-from typing import List
+import argparse
+from label_journal import LabelJournal
+from speech_classifier import ClassificationRunner, PROMPT_VERSION
+from classification_cache import ClassificationCache
+from batch_labeling import BATCH_DIR, export_requests, ingest_results, collect_labels
 
-# Load API key
-load_dotenv()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
-CHECKPOINT_PATH = "label_checkpoint_congress.json"
+JOURNAL_PATH = "label_journal_congress.jsonl"
 INPUT_FILE = "congress_sampled_labeled_speeches.json"
 OUTPUT_FILE = "congress_speeches_labeled.json"
 
-# Topic labels
-topic_labels = [
-    "Economy and Trade",
-    "National Defense and Military",
-    "Foreign Policy and Diplomacy",
-    "Immigration and Border Policy",
-    "Civil Rights and Racial Equality",
-    "Women's Rights",
-    "LGBTQ+ Rights",
-    "Law Enforcement and Criminal Justice",
-    "Healthcare and Public Health",
-    "Education and Schools",
-    "Science, Technology, and Innovation",
-    "Climate and Environment",
-    "Infrastructure and Transportation",
-    "Government Reform and Corruption",
-    "Elections and Democratic Institutions",
-    "Religion, Values, and National Identity",
-    "Social Welfare and Poverty",
-    "Labor, Jobs, and Workers' Rights",
-    "Gun Policy and Second Amendment",
-    "Energy and Natural Resources",
-    "Terrorism, Homeland Security, and War on Terror",
-    "Indigenous and Tribal Affairs"
-]
-
-def build_prompt(text: str) -> str:
-    numbered_topics = "\n".join([f"{i+1}. {label}" for i, label in enumerate(topic_labels)])
-    return (
-        f"You are a classification assistant labeling real U.S. congressional speeches based on the main topics discussed.\n\n"
-        f"From the numbered list of topics below, select up to 5 that are clearly and substantially addressed in the speech.\n"
-        f"- Respond ONLY with a comma-separated list of topic numbers (e.g., 3, 5, 12).\n"
-        f"- Do NOT modify or write out the labels.\n"
-        f"- If no topics are clearly and substantially discussed, respond with: None\n\n"
-        f"Numbered Topics:\n{numbered_topics}\n\n"
-        f"---\nSpeech:\n{text}"
-    )
-
-def chunk_text(text: str, max_chars: int = 12000) -> List[str]:
-    return [text[i:i+max_chars] for i in range(0, len(text), max_chars)]
-
-def classify_speech(text: str) -> List[str]:
-    chunks = chunk_text(text)
-    label_indices = set()
-
-    for idx, chunk in enumerate(chunks):
-        prompt = build_prompt(chunk)
-        try:
-            response = client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[{"role": "user", "content": prompt}]
-            )
-            output = response.choices[0].message.content.strip()
-
-            if output.lower() == "none":
-                continue
-
-            for item in output.split(","):
-                item = item.strip()
-                if item.isdigit():
-                    index = int(item) - 1
-                    if 0 <= index < len(topic_labels):
-                        label_indices.add(index)
-
-        except Exception as e:
-            print(f"Error on chunk {idx+1}: {e}")
-        time.sleep(1)
-
-    if not label_indices:
-        return ["Unlabeled"]
-
-    return [topic_labels[i] for i in sorted(label_indices)[:5]]
-
-def save_checkpoint(results):
-    with open(CHECKPOINT_PATH, "w") as f:
-        json.dump(results, f)
-    print(f"Checkpoint saved to {CHECKPOINT_PATH}")
-
-def load_checkpoint():
-    with open(CHECKPOINT_PATH, "r") as f:
-        return json.load(f)
+runner = ClassificationRunner(speech_type="congressional")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Topic-label the sampled congressional speeches.")
+    parser.add_argument("--batch-export", action="store_true",
+                        help=f"write pending prompts as Batch API request files under {BATCH_DIR}/ instead of calling the API")
+    parser.add_argument("--batch-ingest", nargs="+", metavar="RESULTS",
+                        help="merge Batch API result files into the labels instead of calling the API")
+    args = parser.parse_args()
+
     with open(INPUT_FILE, "r") as f:
         all_documents = json.load(f)
 
-    if os.path.exists(CHECKPOINT_PATH):
-        print(f"Resuming from checkpoint: {CHECKPOINT_PATH}")
-        results = load_checkpoint()
-        doc_status = {r["id"]: r["labels"] for r in results}
-    else:
-        results = []
-        doc_status = {}
+    # Answers already paid for, by chunk; shared across runs and both speech types
+    runner.cache = ClassificationCache()
 
-    total = len(all_documents)
-    for i, doc in enumerate(all_documents, 1):
-        doc_id = doc["id"]
-        existing_labels = doc_status.get(doc_id)
+    # Resume: replaying the journal gives id -> labels for everything classified so far
+    journal = LabelJournal(JOURNAL_PATH, runner.model, PROMPT_VERSION)
+    if len(journal):
+        print(f"Resuming from journal: {JOURNAL_PATH} ({len(journal)} speeches)")
 
-        if existing_labels and existing_labels != ["Unlabeled"]:
+    # A journaled ["Unlabeled"] is the model's real answer; only speeches whose calls failed are retried
+    pending = [doc for doc in all_documents if journal.get(doc["id"]) is None]
+    total = len(all_documents)
+    print(f"{total - len(pending)}/{total} already labeled, classifying {len(pending)} speeches...")
+
+    # Called as each speech's last chunk comes back
+    def on_result(doc_id, labels):
+        if labels is None:
+            print(f"Classification failed for ID {doc_id}; it will be retried on the next run")
+            return
+        print(f"Labels for ID {doc_id}: {labels}")
+        journal.record(doc_id, labels)
+
+    pending_docs = [(doc["id"], doc["text"]) for doc in pending]
+    if args.batch_export:
+        prefix = os.path.join(BATCH_DIR, "congress")
+        paths, n_requests = export_requests(pending_docs, prefix, runner.speech_type, runner.model, runner.cache)
+        print(f"Wrote {n_requests} requests to {len(paths)} batch files under {BATCH_DIR}/; "
+              f"ingest the results with --batch-ingest")
+        journal.close()
+        runner.cache.close()
+        sys.exit(0)
+    elif args.batch_ingest:
+        answered, failed = ingest_results(args.batch_ingest, runner.cache)
+        print(f"Ingested {answered} answered chunks ({failed} failed requests)")
+        for doc_id, labels in collect_labels(pending_docs, runner.speech_type, runner.cache, runner.model):
+            on_result(doc_id, labels)
+    else:
+        runner.classify(pending_docs, on_result)
+    journal.close()
+    runner.cache.close()
+
+    # Join labels back onto the input speeches
+    results = []
+    for doc in all_documents:
+        labels = journal.get(doc["id"])
+        if labels is None:
             continue
-
-        print(f"\n[{i}/{total}] Classifying: {doc['title'][:50]} (ID {doc_id})")
-        labels = classify_speech(doc["text"])
-        print(f"Labels: {labels}")
-
-        results = [r for r in results if r["id"] != doc_id]
         results.append({
-            "id": doc_id,
+            "id": doc["id"],
             "date": doc["date"],
             "title": doc["title"],
             "text": doc["text"],
@@ -129,14 +79,13 @@ if __name__ == "__main__":
             "speaker_party": doc["speaker_party"],
             "labels": labels
         })
-        save_checkpoint(results)
 
     with open(OUTPUT_FILE, "w") as f:
         json.dump(results, f, indent=2)
     print(f"\n Saved labeled speeches to {OUTPUT_FILE}")
 
     try:
-        os.remove(CHECKPOINT_PATH)
-        print("Removed checkpoint file.")
+        os.remove(JOURNAL_PATH)
+        print("Removed label journal.")
     except Exception as e:
-        print(f"Could not delete checkpoint file: {e}")
+        print(f"Could not delete label journal: {e}")
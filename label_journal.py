@@ -0,0 +1,75 @@
+import os
+import json
+
+COMPACT_EVERY = 10_000   # appended records between compactions
+
+
+# Append-only checkpoint of id -> labels for the labeling scripts.
+# The first line records the model and prompt version the labels came from; each further line
+# is one {"id", "labels"} record, and replaying the file keeps the last record per id.
+# Relabeled ids leave dead lines behind, so the file is rewritten from the in-memory dict
+# every COMPACT_EVERY appends.
+class LabelJournal:
+    def __init__(self, path, model, prompt_version, compact_every=COMPACT_EVERY):
+        self.path = path
+        self.header = {"model": model, "prompt_version": prompt_version}
+        self.compact_every = compact_every
+        self.labels = {}
+        self.appended = 0
+
+        if os.path.exists(path):
+            self._replay()
+        else:
+            self._rewrite()
+        self.f = open(path, "a")
+
+    def _replay(self):
+        with open(self.path, "r") as f:
+            header = json.loads(f.readline() or "{}")
+            if header != self.header:
+                raise ValueError(f"{self.path} was written for {header}, not {self.header}; "
+                                 f"move it aside to relabel with the current model/prompt.")
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # Torn last line from an interrupted run; rewrite so new appends start clean
+                    self._rewrite()
+                    return
+                self.labels[record["id"]] = record["labels"]
+
+    def _rewrite(self):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write(json.dumps(self.header) + "\n")
+            for doc_id, labels in self.labels.items():
+                f.write(json.dumps({"id": doc_id, "labels": labels}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def __len__(self):
+        return len(self.labels)
+
+    def get(self, doc_id, default=None):
+        return self.labels.get(doc_id, default)
+
+    def record(self, doc_id, labels):
+        self.labels[doc_id] = labels
+        self.f.write(json.dumps({"id": doc_id, "labels": labels}) + "\n")
+        self.f.flush()
+        self.appended += 1
+        if self.appended >= self.compact_every:
+            self.compact()
+
+    def compact(self):
+        self.f.close()
+        self._rewrite()
+        self.f = open(self.path, "a")
+        self.appended = 0
+        print(f"Compacted {self.path} to {len(self.labels)} records")
+
+    def close(self):
+        self.f.flush()
+        os.fsync(self.f.fileno())
+        self.f.close()
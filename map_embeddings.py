@@ -1,22 +1,87 @@
+import glob
+import zipfile
+import time
+import argparse
 import numpy as np
 import matplotlib.pyplot as plt
-from datetime import datetime
-
-# Load the combined .npz file
-data = np.load("congress_speech_embeddings_100k_combined.npz", allow_pickle=True)
-dates = data["dates"]
-
-# Convert string dates (e.g., "1996-03-13") to datetime objects
-parsed_dates = [datetime.strptime(d, "%Y-%m-%d") for d in dates]
-
-# Plot a histogram by year
-years = [d.year for d in parsed_dates]
-
-plt.figure(figsize=(12, 6))
-plt.hist(years, bins=range(min(years), max(years) + 1), edgecolor='black')
-plt.title("Distribution of Congressional Speech Embedding Dates")
-plt.xlabel("Year")
-plt.ylabel("Number of Speeches")
-plt.tight_layout()
-plt.grid(axis='y', linestyle='--', alpha=0.5)
-plt.show()
+from embedding_store import open_store, CONGRESS_STORE
+from speech_dataset import to_dates
+
+FIRST_YEAR = 1789  # counts[i] is the number of speeches from FIRST_YEAR + i
+
+
+# Add the speeches of each year in `dates` to a running per-year count, growing it as needed
+def add_year_counts(counts, dates):
+    dates = to_dates(dates)
+    years = dates[~np.isnat(dates)].astype("datetime64[Y]").astype(np.int64) + 1970 - FIRST_YEAR
+    new = np.bincount(np.maximum(years, 0), minlength=len(counts))
+    new[:len(counts)] += counts
+    return new
+
+
+# Counts for the rows a store has committed since `start_row`; only the dates column is mapped
+def store_year_counts(store_path, counts=None, start_row=0):
+    store = open_store(store_path)
+    counts = np.zeros(0, dtype=np.int64) if counts is None else counts
+    return add_year_counts(counts, store.column("dates")[start_row:]), len(store)
+
+
+# Counts over chunk .npz files, reading only the dates member of each (npz members load lazily)
+def chunk_year_counts(pattern, counts=None, seen=None):
+    counts = np.zeros(0, dtype=np.int64) if counts is None else counts
+    seen = set() if seen is None else seen
+    for path in sorted(set(glob.glob(pattern)) - seen):
+        try:
+            with np.load(path, allow_pickle=True) as data:
+                counts = add_year_counts(counts, data["dates"])
+        except (zipfile.BadZipFile, EOFError):
+            continue  # still being written; picked up on the next poll
+        seen.add(path)
+    return counts, seen
+
+
+def plot_counts(counts, title):
+    plt.clf()
+    years = np.arange(FIRST_YEAR, FIRST_YEAR + len(counts))
+    nonzero = np.flatnonzero(counts)
+    if len(nonzero):
+        span = slice(nonzero[0], nonzero[-1] + 1)
+        plt.bar(years[span], counts[span], width=1.0, edgecolor='black')
+    plt.title(title)
+    plt.xlabel("Year")
+    plt.ylabel("Number of Speeches")
+    plt.tight_layout()
+    plt.grid(axis='y', linestyle='--', alpha=0.5)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Histogram of speech dates, read without loading any embeddings.")
+    parser.add_argument("--store", default=CONGRESS_STORE)
+    parser.add_argument("--chunks", help="glob of chunk .npz files to read instead of the store")
+    parser.add_argument("--watch", type=float, default=0, help="poll every N seconds for new rows or chunk files")
+    parser.add_argument("--output", help="save the figure as a PNG instead of showing it")
+    args = parser.parse_args()
+
+    title = "Distribution of Congressional Speech Embedding Dates"
+    counts, rows, seen = None, 0, None
+    plt.figure(figsize=(12, 6))
+    while True:
+        # Only rows or files added since the last poll are read
+        if args.chunks:
+            counts, seen = chunk_year_counts(args.chunks, counts, seen)
+        else:
+            counts, rows = store_year_counts(args.store, counts, rows)
+        print(f"{int(counts.sum())} dated speeches")
+        plot_counts(counts, title)
+
+        if args.output:
+            plt.savefig(args.output)
+        if not args.watch:
+            break
+        if not args.output:
+            plt.pause(args.watch)
+        else:
+            time.sleep(args.watch)
+
+    if not args.output:
+        plt.show()
@@ -1,24 +1,40 @@
-import numpy as np
+import argparse
 import matplotlib.pyplot as plt
+from speech_dataset import load_dataset
+from density_plot import render_density, label_pairs, GRID_SIZE
+
+parser = argparse.ArgumentParser(description="Plot the 2D PCA projection colored by year or label.")
+parser.add_argument("--source", default="pca_embeddings.npz")
+parser.add_argument("--output", help="write a binned density PNG here instead of showing a scatter plot")
+parser.add_argument("--bins", type=int, default=GRID_SIZE, help="grid cells per axis for --output")
+parser.add_argument("--labels", help="label-mask npz or labeled dataset; color --output cells by the label most of their points carry")
+args = parser.parse_args()
 
 # Load PCA-reduced embeddings and metadata
-data = np.load("pca_embeddings.npz", allow_pickle=True)
+data = load_dataset(args.source, mmap_mode="r")
 
-doc_names = data["doc_names"]
-dates = data["dates"]
 pca_2d = data["pca_2d"]
 
-# Extract year from each date string
-years = np.array([int(date.split("-")[0]) for date in dates])
+# Dates are stored as datetime64[D], so years come out vectorized
+years = data.years
 
-# Plot
-plt.figure(figsize=(12, 8))
-scatter = plt.scatter(pca_2d[:, 0], pca_2d[:, 1], c=years, cmap='plasma', s=40)
+# Headless: bin the points and write the PNG directly, for corpora too large to scatter
+if args.output:
+    points, codes, label_names = label_pairs(data.ids, args.labels) if args.labels else (None, None, None)
+    render_density(args.output, pca_2d, values=None if args.labels else years,
+                   pairs=(points, codes) if args.labels else None,
+                   label_names=label_names, bins=args.bins, title=f"PCA of {len(years)} Speeches",
+                   xlabel="PCA Dimension 1", ylabel="PCA Dimension 2")
+    print(f"Saved density plot to {args.output}")
+else:
+    # Plot
+    plt.figure(figsize=(12, 8))
+    scatter = plt.scatter(pca_2d[:, 0], pca_2d[:, 1], c=years, cmap='plasma', s=40)
 
-plt.colorbar(scatter, label="Year")
-plt.xlabel("PCA Dimension 1")
-plt.ylabel("PCA Dimension 2")
-plt.title("PCA of Presidential Speeches Colored by Year")
-plt.grid(True)
-plt.tight_layout()
-plt.show()
+    plt.colorbar(scatter, label="Year")
+    plt.xlabel("PCA Dimension 1")
+    plt.ylabel("PCA Dimension 2")
+    plt.title("PCA of Presidential Speeches Colored by Year")
+    plt.grid(True)
+    plt.tight_layout()
+    plt.show()
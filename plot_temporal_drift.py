@@ -0,0 +1,36 @@
+import sys
+import numpy as np
+import matplotlib.pyplot as plt
+from embedding_store import CONGRESS_STORE
+from temporal_aggregation import cube_path
+
+# Load the precomputed cube (see temporal_aggregation.py); no raw embeddings are read
+path = sys.argv[1] if len(sys.argv) > 1 else cube_path("year", CONGRESS_STORE)
+cube = np.load(path)
+by = str(cube["by"])
+names = cube["group_names"]
+counts = cube["counts"]
+shares = cube["label_shares"]
+label_names = cube["label_names"]
+x = np.arange(len(names))
+
+fig, (ax_drift, ax_shares) = plt.subplots(2, 1, figsize=(14, 10), sharex=True)
+
+# Centroid drift between consecutive groups
+ax_drift.plot(x, cube["drift"], marker="o", markersize=3)
+ax_drift.set_ylabel("Cosine distance to previous group")
+ax_drift.set_title(f"Embedding Centroid Drift by {by.capitalize()}")
+ax_drift.grid(True)
+
+# Share of speeches carrying each label; the eight largest overall get their own band
+top = np.argsort(-(shares * counts[:, None]).sum(axis=0))[:8]
+ax_shares.stackplot(x, shares[:, top].T, labels=label_names[top])
+ax_shares.set_ylabel("Share of speeches")
+ax_shares.set_title(f"Topic Shares by {by.capitalize()} (nearest label centroids)")
+ax_shares.legend(loc="upper left", fontsize=8)
+
+step = max(1, len(names) // 20)
+ax_shares.set_xticks(x[::step])
+ax_shares.set_xticklabels(names[::step], rotation=60, ha="right")
+plt.tight_layout()
+plt.show()
@@ -1,24 +1,40 @@
-import numpy as np
+import argparse
 import matplotlib.pyplot as plt
+from speech_dataset import load_dataset
+from density_plot import render_density, label_pairs, GRID_SIZE
+
+parser = argparse.ArgumentParser(description="Plot the 2D UMAP projection colored by year or label.")
+parser.add_argument("--source", default="umap_embeddings.npz")
+parser.add_argument("--output", help="write a binned density PNG here instead of showing a scatter plot")
+parser.add_argument("--bins", type=int, default=GRID_SIZE, help="grid cells per axis for --output")
+parser.add_argument("--labels", help="label-mask npz or labeled dataset; color --output cells by the label most of their points carry")
+args = parser.parse_args()
 
 # Load UMAP results
-data = np.load("umap_embeddings.npz", allow_pickle=True)
+data = load_dataset(args.source, mmap_mode="r")
 
-doc_names = data["doc_names"]
-dates = data["dates"]
 umap_2d = data["umap_2d"]
 
-# Convert year from date string
-years = np.array([int(date.split("-")[0]) for date in dates])
+# Dates are stored as datetime64[D], so years come out vectorized
+years = data.years
 
-# Plot
-plt.figure(figsize=(12, 8))
-scatter = plt.scatter(umap_2d[:, 0], umap_2d[:, 1], c=years, cmap='plasma', s=40)
+# Headless: bin the points and write the PNG directly, for corpora too large to scatter
+if args.output:
+    points, codes, label_names = label_pairs(data.ids, args.labels) if args.labels else (None, None, None)
+    render_density(args.output, umap_2d, values=None if args.labels else years,
+                   pairs=(points, codes) if args.labels else None,
+                   label_names=label_names, bins=args.bins, title=f"UMAP of {len(years)} Speeches",
+                   xlabel="UMAP Dimension 1", ylabel="UMAP Dimension 2")
+    print(f"Saved density plot to {args.output}")
+else:
+    # Plot
+    plt.figure(figsize=(12, 8))
+    scatter = plt.scatter(umap_2d[:, 0], umap_2d[:, 1], c=years, cmap='plasma', s=40)
 
-plt.colorbar(scatter, label="Year")
-plt.xlabel("UMAP Dimension 1")
-plt.ylabel("UMAP Dimension 2")
-plt.title("UMAP of Presidential Speeches Colored by Year")
-plt.grid(True)
-plt.tight_layout()
-plt.show()
+    plt.colorbar(scatter, label="Year")
+    plt.xlabel("UMAP Dimension 1")
+    plt.ylabel("UMAP Dimension 2")
+    plt.title("UMAP of Presidential Speeches Colored by Year")
+    plt.grid(True)
+    plt.tight_layout()
+    plt.show()
@@ -1,20 +1,19 @@
-import numpy as np
+from embedding_store import open_store, CONGRESS_STORE
 
-# Load the NPZ file
-file_path = "congress_speech_embeddings_100k_combined.npz"
-data = np.load(file_path, allow_pickle=True)
+# Open the embedding store (memory-mapped, nothing is read until accessed)
+store = open_store(CONGRESS_STORE)
 
 # Extract and display the first 10 entries
-doc_ids = data["doc_ids"]
-dates = data["dates"]
-embeddings = data["embeddings"]
+doc_ids = store.column("ids")
+dates = store.column("dates")
+embeddings = store.embeddings
 
 # Prepare preview of first 10 speeches
 preview = []
-for i in range(10):
+for i in range(min(10, len(store))):
     preview.append({
-        "id": doc_ids[i],
-        "date": dates[i],
+        "id": int(doc_ids[i]),
+        "date": str(dates[i]),
         "embedding_preview": embeddings[i][:5].tolist()  # Show first 5 values of the embedding
     })
 
@@ -0,0 +1,65 @@
+import os
+import argparse
+import numpy as np
+from embedding_store import EmbeddingStore, open_store, CONGRESS_STORE, EMBEDDING_DTYPES
+
+BLOCK_SIZE = 10_000
+
+
+def store_bytes(path):
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+
+# Copy a store into a new one with a different embedding encoding, block by block
+def quantize_store(source_path, output_path, dtype, block_size=BLOCK_SIZE):
+    source = open_store(source_path)
+    output = EmbeddingStore.create(output_path, source.dim, source.columns, dtype, source.model)
+    embeddings = source.embeddings
+    columns = {name: source.column(name) for name in source.columns}
+    for start, stop in source.iter_blocks(block_size):
+        output.append(embeddings[start:stop], **{name: column[start:stop] for name, column in columns.items()})
+    return output
+
+
+def cosine(a, b):
+    return (a * b).sum(axis=1) / np.maximum(np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1), 1e-12)
+
+
+# How much quantization moves each vector and the speech-to-speech similarities consumers rely on
+def quantization_error(source, quantized, n_pairs=100_000, seed=0):
+    rng = np.random.default_rng(seed)
+    n = len(source)
+    left = np.sort(rng.integers(0, n, n_pairs))
+    right = rng.integers(0, n, n_pairs)
+    original, restored = source.embeddings, quantized.embeddings
+
+    self_similarity = cosine(np.asarray(original[left]), restored[left])
+    a, b = np.asarray(original[left]), np.asarray(original[right])
+    qa, qb = restored[left], restored[right]
+    pair_error = np.abs(cosine(qa, qb) - cosine(a, b))
+    return {
+        "vector_cosine_min": float(self_similarity.min()),
+        "vector_cosine_mean": float(self_similarity.mean()),
+        "pair_error_mean": float(pair_error.mean()),
+        "pair_error_p99": float(np.percentile(pair_error, 99)),
+        "pair_error_max": float(pair_error.max()),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write a float16/int8 copy of an embedding store and report the error.")
+    parser.add_argument("--source", default=CONGRESS_STORE)
+    parser.add_argument("--dtype", choices=EMBEDDING_DTYPES[1:], default="int8")
+    parser.add_argument("--output", default=None, help="defaults to <source>_<dtype>")
+    parser.add_argument("--pairs", type=int, default=100_000, help="random speech pairs used for the error report")
+    args = parser.parse_args()
+
+    output_path = args.output or f"{args.source.rstrip('/')}_{args.dtype}"
+    quantized = quantize_store(args.source, output_path, args.dtype)
+    source = open_store(args.source)
+    print(f"Wrote {len(quantized)} {args.dtype} embeddings to {output_path}: "
+          f"{store_bytes(output_path) / 1e6:,.1f} MB vs {store_bytes(args.source) / 1e6:,.1f} MB")
+
+    print("Cosine-similarity error introduced by quantization:")
+    for name, value in quantization_error(source, quantized, args.pairs).items():
+        print(f"  {name}: {value:.6f}")
@@ -1,104 +1,135 @@
 import os
 import json
-import numpy as np
+import codecs
+from speech_corpus import write_corpus
 
 CHECKPOINT_FILE = "congress_checkpoint.json"
 RECOVERY_PROGRESS = "recovery_progress_checkpoint.json"
 CHUNK_SIZE = 50000
-
-def extract_and_save_chunks(filepath, already_recovered=0, chunk_index=0):
-    with open(filepath, "r") as f:
-        raw = f.read()
-
-    start = raw.find('"data": [')
-    if start == -1:
-        raise ValueError("Could not find 'data' array.")
-    start_bracket = raw.find('[', start)
-    content = raw[start_bracket + 1:]
-
-    brace_depth = 0
-    in_string = False
-    escape = False
-    obj_start = None
-
-    obj_count = 0
-    i = 0
-    buffer = []
-
-    while i < len(content):
-        char = content[i]
-
-        if char == '"' and not escape:
-            in_string = not in_string
-        elif char == '\\' and not escape:
-            escape = True
-            i += 1
-            continue
-        escape = False
-
-        if in_string:
-            i += 1
-            continue
-
-        if char == '{':
-            if brace_depth == 0:
-                obj_start = i
-            brace_depth += 1
-        elif char == '}':
-            brace_depth -= 1
-            if brace_depth == 0 and obj_start is not None:
-                if obj_count < already_recovered:
-                    obj_count += 1
-                    i += 1
+BLOCK_SIZE = 8 * 1024 * 1024     # bytes read from disk at a time
+MAX_OBJECT_SIZE = 16 * 1024 * 1024  # an object still undecodable past this size is treated as corrupt
+
+decoder = json.JSONDecoder()
+
+# Streams the checkpoint in fixed-size blocks and decodes one speech object at a time with
+# raw_decode, so memory stays bounded by the block size and the largest object. `offset` is
+# the byte position just after the last object handed out, which makes resuming a seek.
+class ObjectStream:
+    def __init__(self, f, offset):
+        self.f = f
+        self.f.seek(offset)
+        self.utf8 = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self.text = ""
+        self.pos = 0
+        self.offset = offset
+        self.eof = False
+
+    # Drop the consumed prefix (accounting for its size in bytes) and append the next block
+    def _refill(self):
+        consumed = self.text[:self.pos]
+        self.offset += len(consumed) if consumed.isascii() else len(consumed.encode("utf-8"))
+        self.text = self.text[self.pos:]
+        self.pos = 0
+        block = self.f.read(BLOCK_SIZE)
+        self.eof = not block
+        self.text += self.utf8.decode(block, final=self.eof)
+        return not self.eof
+
+    def _skip_separators(self):
+        while True:
+            while self.pos < len(self.text) and self.text[self.pos] in " \t\r\n,":
+                self.pos += 1
+            if self.pos < len(self.text) or not self._refill():
+                return
+
+    # Advance to the opening '[' of the "data" array in a fresh checkpoint
+    def seek_data_array(self):
+        while True:
+            start = self.text.find('"data": [', self.pos)
+            if start != -1:
+                self.pos = self.text.index("[", start) + 1
+                return
+            self.pos = max(len(self.text) - 16, self.pos)
+            if not self._refill():
+                raise ValueError("Could not find 'data' array.")
+
+    def __iter__(self):
+        while True:
+            self._skip_separators()
+            if self.pos >= len(self.text) or self.text[self.pos] == "]":
+                return
+            try:
+                obj, end = decoder.raw_decode(self.text, self.pos)
+                self.pos = end
+                yield obj
+            except json.JSONDecodeError:
+                if not self.eof and len(self.text) - self.pos < MAX_OBJECT_SIZE:
+                    self._refill()  # object spans the block boundary
                     continue
+                # Corrupt or truncated object: resynchronise on the next speech object
+                next_start = self.text.find('{"id"', self.pos + 1)
+                while next_start == -1 and not self.eof:
+                    self.pos = max(len(self.text) - 8, self.pos + 1)
+                    self._refill()
+                    next_start = self.text.find('{"id"', self.pos)
+                if next_start == -1:
+                    return
+                self.pos = next_start
+
+    # Byte offset in the file of the current read position
+    def tell(self):
+        consumed = self.text[:self.pos]
+        return self.offset + (len(consumed) if consumed.isascii() else len(consumed.encode("utf-8")))
+
+
+def save_progress(obj_count, chunk_index, offset):
+    tmp_path = RECOVERY_PROGRESS + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"count": obj_count, "chunk_index": chunk_index, "offset": offset}, f)
+    os.replace(tmp_path, RECOVERY_PROGRESS)
+
+def extract_and_save_chunks(filepath, already_recovered=0, chunk_index=0, offset=None):
+    obj_count = already_recovered
+    buffer = []
 
-                obj_str = content[obj_start:i+1]
-                try:
-                    obj = json.loads(obj_str)
-                    buffer.append(obj)
-                    obj_count += 1
-
-                    if obj_count % 50 == 0:
-                        print(f"[{obj.get('id', '?')}] {obj.get('title', '')[:50]} — {' '.join(obj.get('text', '').split()[:20])}...\n")
-
-                    if len(buffer) == CHUNK_SIZE:
-                        save_chunk(buffer, chunk_index)
-                        buffer = []
-                        chunk_index += 1
-
-                        with open(RECOVERY_PROGRESS, "w") as f:
-                            json.dump({"count": obj_count, "chunk_index": chunk_index}, f)
-                        print(f"Saved chunk {chunk_index}, total recovered: {obj_count}")
-
-                except json.JSONDecodeError:
-                    pass
-        i += 1
-
-    # Save remaining buffer
-    if buffer:
-        save_chunk(buffer, chunk_index)
-        with open(RECOVERY_PROGRESS, "w") as f:
-            json.dump({"count": obj_count, "chunk_index": chunk_index + 1}, f)
-        print(f"Final chunk {chunk_index} saved with {len(buffer)} speeches.")
+    with open(filepath, "rb") as f:
+        stream = ObjectStream(f, offset or 0)
+        skip = 0
+        if offset is None:
+            stream.seek_data_array()
+            skip = already_recovered  # progress saved before offsets were recorded
+            obj_count = 0
+
+        for obj in stream:
+            if skip:
+                skip -= 1
+                obj_count += 1
+                continue
+
+            buffer.append(obj)
+            obj_count += 1
+
+            if obj_count % 50 == 0:
+                print(f"[{obj.get('id', '?')}] {obj.get('title', '')[:50]} — {' '.join(obj.get('text', '').split()[:20])}...\n")
+
+            if len(buffer) == CHUNK_SIZE:
+                save_chunk(buffer, chunk_index)
+                buffer = []
+                chunk_index += 1
+                save_progress(obj_count, chunk_index, stream.tell())
+                print(f"Saved chunk {chunk_index}, total recovered: {obj_count}")
+
+        # Save remaining buffer
+        if buffer:
+            save_chunk(buffer, chunk_index)
+            save_progress(obj_count, chunk_index + 1, stream.tell())
+            print(f"Final chunk {chunk_index} saved with {len(buffer)} speeches.")
 
 def save_chunk(data, index):
     suffix = str(index + 1).zfill(5)
-    json_path = f"recovered_part_{suffix}.json"
-    npz_path = f"recovered_part_{suffix}.npz"
-
-    with open(json_path, "w") as f:
-        json.dump(data, f, indent=2)
-
-    np.savez(
-        npz_path,
-        ids=np.array([d["id"] for d in data]),
-        dates=np.array([d["date"] for d in data]),
-        titles=np.array([d["title"] for d in data]),
-        texts=np.array([d["text"] for d in data]),
-        speaker_states=np.array([d["speaker_state"] for d in data]),
-        speaker_parties=np.array([d["speaker_party"] for d in data]),
-    )
-    print(f"Saved to {json_path} and {npz_path}")
+    corpus_path = f"recovered_part_{suffix}.corpus"
+    write_corpus(corpus_path, data)
+    print(f"Saved to {corpus_path}")
 
 # Load progress
 if os.path.exists(RECOVERY_PROGRESS):
@@ -106,10 +137,12 @@ if os.path.exists(RECOVERY_PROGRESS):
         prog = json.load(f)
     already_recovered = prog.get("count", 0)
     chunk_index = prog.get("chunk_index", 0)
+    offset = prog.get("offset")
     print(f"Resuming from speech #{already_recovered}, chunk {chunk_index}")
 else:
     already_recovered = 0
     chunk_index = 0
+    offset = None
     print("Starting fresh recovery...")
 
-extract_and_save_chunks(CHECKPOINT_FILE, already_recovered, chunk_index)
+extract_and_save_chunks(CHECKPOINT_FILE, already_recovered, chunk_index, offset)
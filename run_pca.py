@@ -1,25 +1,83 @@
+import time
+import argparse
 import numpy as np
-from sklearn.decomposition import PCA
+from sklearn.decomposition import IncrementalPCA
+from embedding_store import open_embeddings
+from speech_dataset import save_dataset
 
-# Load the original high-dimensional embeddings
-data = np.load("speech_embeddings.npz", allow_pickle=True)
+SOURCE = "speech_embeddings.npz"
+OUTPUT_FILE = "pca_embeddings.npz"
+MODEL_FILE = "pca_model.npz"
+BLOCK_SIZE = 10_000
 
-doc_names = data["doc_names"]
-dates = data["dates"]
-embeddings = data["embeddings"]
 
-# Run PCA to reduce from 1536 → 2 dimensions
-print("Running PCA...")
-pca = PCA(n_components=2)
-pca_embeddings = pca.fit_transform(embeddings)
+# Fit PCA one block at a time, so only a block of the (memmapped) embeddings is in memory
+def fit_pca(embeddings, n_components=2, block_size=BLOCK_SIZE):
+    n = len(embeddings)
+    # Every partial_fit batch needs at least n_components rows; fold a short tail into the previous block
+    block_size = max(block_size, n_components)
+    starts = list(range(0, n, block_size))
+    if len(starts) > 1 and n - starts[-1] < n_components:
+        starts.pop()
+    pca = IncrementalPCA(n_components=n_components)
+    for i, start in enumerate(starts):
+        stop = starts[i + 1] if i + 1 < len(starts) else n
+        pca.partial_fit(np.asarray(embeddings[start:stop], dtype=np.float32))
+        print(f"Fitted {stop}/{n} embeddings...", end="\r")
+    print()
+    return pca
 
-print(f"PCA completed. Shape: {pca_embeddings.shape}")
-print(f"Explained variance: {pca.explained_variance_ratio_}")
 
-# Save the 2D PCA results + metadata
-np.savez("pca_embeddings.npz",
-         doc_names=doc_names,
-         dates=dates,
-         pca_2d=pca_embeddings)
+# The fitted projection as plain arrays, so new speeches can be projected without sklearn state
+def save_model(path, pca):
+    np.savez(path, mean=pca.mean_, components=pca.components_,
+             explained_variance=pca.explained_variance_, explained_variance_ratio=pca.explained_variance_ratio_)
 
-print("Saved PCA results to pca_embeddings.npz")
+
+def load_model(path=MODEL_FILE):
+    data = np.load(path)
+    return {name: data[name] for name in data.files}
+
+
+def project(embeddings, model, block_size=BLOCK_SIZE):
+    mean, components = model["mean"], model["components"]
+    out = np.empty((len(embeddings), len(components)), dtype=np.float32)
+    for start in range(0, len(embeddings), block_size):
+        block = np.asarray(embeddings[start:start + block_size], dtype=np.float32)
+        out[start:start + len(block)] = (block - mean) @ components.T
+    return out
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Out-of-core PCA of speech embeddings.")
+    parser.add_argument("--source", default=SOURCE, help="embedding store directory or npz file")
+    parser.add_argument("--output", default=OUTPUT_FILE)
+    parser.add_argument("--model", default=MODEL_FILE, help="where the fitted components are saved/loaded")
+    parser.add_argument("--components", type=int, default=2)
+    parser.add_argument("--block-size", type=int, default=BLOCK_SIZE)
+    parser.add_argument("--project-only", action="store_true", help="project with the saved model instead of refitting")
+    args = parser.parse_args()
+
+    # Load the original high-dimensional embeddings
+    embeddings, ids, dates = open_embeddings(args.source)
+    print(f"Loaded {len(ids)} embeddings from {args.source}")
+
+    if args.project_only:
+        model = load_model(args.model)
+        print(f"Projecting onto the {len(model['components'])} components in {args.model}")
+    else:
+        print(f"Running PCA to {args.components} dimensions...")
+        start = time.perf_counter()
+        pca = fit_pca(embeddings, args.components, args.block_size)
+        print(f"PCA fitted in {time.perf_counter() - start:.1f}s. Explained variance: {pca.explained_variance_ratio_}")
+        save_model(args.model, pca)
+        print(f"Saved PCA components to {args.model}")
+        model = load_model(args.model)
+
+    pca_embeddings = project(embeddings, model, args.block_size)
+    print(f"PCA completed. Shape: {pca_embeddings.shape}")
+
+    # Save the reduced results + metadata
+    metadata = {"doc_names" if ids.dtype.kind in "US" else "ids": ids, "dates": dates}
+    save_dataset(args.output, **metadata, pca=pca_embeddings, pca_2d=pca_embeddings[:, :2])
+    print(f"Saved PCA results to {args.output}")
@@ -1,25 +1,122 @@
+import os
+import time
+import argparse
+import joblib
 import numpy as np
 import umap
-import os
+from multiprocessing import Pool
+from sklearn.manifold import trustworthiness
+from embedding_store import open_embeddings
+from run_pca import fit_pca, project, save_model, load_model
+from speech_dataset import save_dataset
+from density_plot import first_labels
+
+SOURCE = "speech_embeddings.npz"
+OUTPUT_FILE = "umap_embeddings.npz"
+REDUCER_FILE = "umap_reducer.joblib"
+PCA_MODEL_FILE = "umap_pca_model.npz"
+PCA_COMPONENTS = 50
+FIT_SIZE = 20_000        # speeches UMAP is fitted on; the rest are mapped with transform
+TRANSFORM_BATCH = 5_000
+TRUST_SAMPLE = 2_000     # trustworthiness is quadratic in the sample size
+
+# Per-worker reducer, loaded once by the pool initializer
+_reducer = None
+
+
+def _init_worker(reducer_path):
+    global _reducer
+    _reducer = joblib.load(reducer_path)
+
+
+def _transform_batch(batch):
+    return _reducer.transform(batch)
+
+
+# Sample n rows with every stratum represented in proportion to its size (at least one row each)
+def stratified_sample(strata, n, seed=42):
+    rng = np.random.default_rng(seed)
+    if n >= len(strata):
+        return np.arange(len(strata))
+    values, inverse, counts = np.unique(strata, return_inverse=True, return_counts=True)
+    quota = np.minimum(counts, np.maximum(1, np.round(counts * n / len(strata)).astype(np.int64)))
+    # Shuffle, then keep the first `quota` rows of each stratum
+    order = rng.permutation(len(strata))
+    order = order[np.argsort(inverse[order], kind="stable")]
+    rank = np.arange(len(order)) - np.repeat(np.cumsum(counts) - counts, counts)
+    return np.sort(order[rank < np.repeat(quota, counts)])
+
+
+def transform_parallel(reducer_path, features, batch_size=TRANSFORM_BATCH, workers=None):
+    batches = [features[start:start + batch_size] for start in range(0, len(features), batch_size)]
+    out = []
+    with Pool(workers or os.cpu_count(), initializer=_init_worker, initargs=(reducer_path,)) as pool:
+        for done, result in enumerate(pool.imap(_transform_batch, batches), 1):
+            out.append(result)
+            print(f"Transformed {min(done * batch_size, len(features))}/{len(features)} speeches...", end="\r")
+    print()
+    return np.concatenate(out) if out else np.empty((0, 2), dtype=np.float32)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Staged UMAP: PCA pre-reduction, subsample fit, batched transform.")
+    parser.add_argument("--source", default=SOURCE, help="embedding store directory or npz file")
+    parser.add_argument("--output", default=OUTPUT_FILE)
+    parser.add_argument("--pca", type=int, default=PCA_COMPONENTS, help="PCA dimensions before UMAP (0 = none)")
+    parser.add_argument("--fit-size", type=int, default=FIT_SIZE)
+    parser.add_argument("--labels", help="label-mask npz or labeled dataset; stratify the fit sample by year and first label")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--reducer", default=REDUCER_FILE, help="where the fitted reducer is saved")
+    parser.add_argument("--trust-sample", type=int, default=TRUST_SAMPLE, help="rows for the trustworthiness score (0 = skip)")
+    args = parser.parse_args()
+    timings = {}
+
+    # Load the embeddings and metadata
+    embeddings, ids, dates = open_embeddings(args.source)
+    print(f"Loaded {len(ids)} embeddings from {args.source}")
 
-# Load the embeddings and metadata
-data = np.load("speech_embeddings.npz", allow_pickle=True)
+    # Stage 1: PCA pre-reduction, so UMAP's neighbor search runs on ~50 dims instead of 1536
+    start = time.perf_counter()
+    if args.pca:
+        print(f"Reducing to {args.pca} dimensions with PCA...")
+        save_model(PCA_MODEL_FILE, fit_pca(embeddings, args.pca))
+        features = project(embeddings, load_model(PCA_MODEL_FILE))
+    else:
+        features = np.asarray(embeddings, dtype=np.float32)
+    timings["pca"] = time.perf_counter() - start
 
-doc_names = data["doc_names"]
-dates = data["dates"]
-embeddings = data["embeddings"]
+    # Stage 2: fit UMAP on a sample stratified by year (and label), keeping rare eras in the layout
+    start = time.perf_counter()
+    strata = dates.astype("datetime64[Y]").astype(np.int64) if dates is not None else np.zeros(len(ids), dtype=np.int64)
+    if args.labels:
+        strata = strata * 64 + first_labels(ids, args.labels)[0] + 1
+    fit_rows = stratified_sample(strata, args.fit_size)
+    print(f"Fitting UMAP on {len(fit_rows)} of {len(ids)} speeches ({len(np.unique(strata))} strata)...")
+    reducer = umap.UMAP(n_components=2, random_state=42)
+    umap_embeddings = np.empty((len(ids), 2), dtype=np.float32)
+    umap_embeddings[fit_rows] = reducer.fit_transform(features[fit_rows])
+    joblib.dump(reducer, args.reducer)
+    print(f"Saved fitted reducer to {args.reducer}")
+    timings["fit"] = time.perf_counter() - start
 
-# Run UMAP to reduce from 1536 → 2 dimensions
-print("Running UMAP...")
-reducer = umap.UMAP(n_components=2, random_state=42)
-umap_embeddings = reducer.fit_transform(embeddings)
+    # Stage 3: map everything else through the saved reducer in parallel batches
+    start = time.perf_counter()
+    rest = np.setdiff1d(np.arange(len(ids)), fit_rows)
+    if len(rest):
+        umap_embeddings[rest] = transform_parallel(args.reducer, features[rest], workers=args.workers)
+    timings["transform"] = time.perf_counter() - start
 
-print(f"UMAP completed. Shape: {umap_embeddings.shape}")
+    print(f"UMAP completed. Shape: {umap_embeddings.shape}")
+    print("Timings: " + ", ".join(f"{stage} {seconds:.1f}s" for stage, seconds in timings.items()))
 
-# Save the 2D UMAP results + metadata
-np.savez("umap_embeddings.npz",
-         doc_names=doc_names,
-         dates=dates,
-         umap_2d=umap_embeddings)
+    # How well local neighborhoods of the original embeddings survive in 2D (1.0 = perfectly)
+    if args.trust_sample:
+        rng = np.random.default_rng(0)
+        rows = np.sort(rng.choice(len(ids), min(args.trust_sample, len(ids)), replace=False))
+        score = trustworthiness(np.asarray(embeddings[rows], dtype=np.float32), umap_embeddings[rows], n_neighbors=10)
+        print(f"Trustworthiness (k=10, {len(rows)} speeches): {score:.4f}")
 
-print("Saved UMAP results to umap_embeddings.npz")
+    # Save the 2D UMAP results + metadata
+    metadata = {"doc_names" if ids.dtype.kind in "US" else "ids": ids, "dates": dates}
+    save_dataset(args.output, **metadata, umap_2d=umap_embeddings)
+    print(f"Saved UMAP results to {args.output}")
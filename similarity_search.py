@@ -0,0 +1,264 @@
+import os
+import json
+import time
+import argparse
+import numpy as np
+from embedding_store import open_embeddings, CONGRESS_STORE
+
+INDEX_DIR = "congress_ivf_index"
+BLOCK_SIZE = 20_000
+KMEANS_SAMPLE_PER_LIST = 64   # training points per centroid
+KMEANS_ITERATIONS = 10
+N_PROBE = 8
+MISSING_ID = -1
+
+
+def normalize_rows(x):
+    x = np.asarray(x, dtype=np.float32)
+    return x / np.maximum(np.linalg.norm(x, axis=1, keepdims=True), 1e-12)
+
+
+# Fold a block of candidate scores into the running per-query top-k (best first after finish_top_k)
+def merge_top_k(best_scores, best_rows, scores, rows, k):
+    scores = np.concatenate([best_scores, scores], axis=1)
+    rows = np.concatenate([best_rows, rows], axis=1)
+    if scores.shape[1] > k:
+        keep = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        scores = np.take_along_axis(scores, keep, axis=1)
+        rows = np.take_along_axis(rows, keep, axis=1)
+    return scores, rows
+
+
+def finish_top_k(scores, rows):
+    order = np.argsort(-scores, axis=1, kind="stable")
+    return np.take_along_axis(scores, order, axis=1), np.take_along_axis(rows, order, axis=1)
+
+
+def empty_top_k(n_queries, k):
+    return np.full((n_queries, k), -np.inf, dtype=np.float32), np.full((n_queries, k), -1, dtype=np.int64)
+
+
+# Ids at the given result rows; padding rows (-1, score -inf) get MISSING_ID ("" for string ids)
+# so they can never be mistaken for a real neighbor
+def ids_at(ids, rows):
+    ids = np.asarray(ids)
+    found = ids[np.maximum(rows, 0)] if len(ids) else np.zeros(rows.shape, dtype=ids.dtype)
+    return np.where(rows >= 0, found, MISSING_ID if ids.dtype.kind in "iu" else "")
+
+
+# Row of each id in `ids`, via a sorted index; raises KeyError for unknown ids
+def lookup_rows(ids, query_ids):
+    order = np.argsort(ids, kind="stable")
+    query_ids = np.asarray(query_ids, dtype=ids.dtype)
+    pos = np.clip(np.searchsorted(ids[order], query_ids), 0, len(ids) - 1)
+    missing = ids[order][pos] != query_ids
+    if missing.any():
+        raise KeyError(f"Unknown ids: {query_ids[missing][:10].tolist()}")
+    return order[pos]
+
+
+# Exact cosine top-k: scans the (memmapped) matrix block by block, so memory stays bounded
+class ExactIndex:
+    def __init__(self, embeddings, ids, block_size=BLOCK_SIZE):
+        self.embeddings = embeddings
+        self.ids = np.asarray(ids)
+        self.block_size = block_size
+
+    def search(self, queries, k=10):
+        queries = normalize_rows(queries)
+        best_scores, best_rows = empty_top_k(len(queries), k)
+        for start in range(0, len(self.ids), self.block_size):
+            block = normalize_rows(self.embeddings[start:start + self.block_size])
+            scores = queries @ block.T
+            rows = np.broadcast_to(np.arange(start, start + len(block)), scores.shape)
+            best_scores, best_rows = merge_top_k(best_scores, best_rows, scores, rows, k)
+        scores, rows = finish_top_k(best_scores, best_rows)
+        return ids_at(self.ids, rows), scores
+
+    def search_ids(self, query_ids, k=10):
+        rows = lookup_rows(self.ids, query_ids)
+        return self.search(self.embeddings[rows], k)
+
+
+# Spherical k-means on a sample; returns unit-norm centroids
+def train_centroids(embeddings, n_lists, iterations=KMEANS_ITERATIONS, seed=0):
+    rng = np.random.default_rng(seed)
+    n = len(embeddings)
+    sample = np.sort(rng.choice(n, min(n, n_lists * KMEANS_SAMPLE_PER_LIST), replace=False))
+    x = normalize_rows(embeddings[sample])
+    centroids = x[rng.choice(len(x), n_lists, replace=False)].copy()
+    for _ in range(iterations):
+        assign = np.argmax(x @ centroids.T, axis=1)
+        counts = np.bincount(assign, minlength=n_lists)
+        empty = counts == 0
+        sums = np.zeros_like(centroids)
+        sums[~empty] = np.add.reduceat(x[np.argsort(assign, kind="stable")], (np.cumsum(counts) - counts)[~empty])
+        # Reseed empty lists on random sample points so every list stays in use
+        sums[empty] = x[rng.choice(len(x), int(empty.sum()), replace=False)]
+        centroids = normalize_rows(sums)
+    return centroids
+
+
+# Inverted-file index: vectors are bucketed by nearest k-means centroid and stored list by
+# list, and a query only scans the n_probe lists whose centroids are closest to it.
+# Stored as plain .npy files in a directory and loaded with mmap_mode="r".
+class IVFIndex:
+    def __init__(self, centroids, offsets, vectors, ids):
+        self.centroids = centroids
+        self.offsets = offsets
+        self.vectors = vectors
+        self.ids = ids
+
+    @property
+    def n_lists(self):
+        return len(self.centroids)
+
+    # Builds the index directory at `path`. The normalized vectors are written list by list
+    # straight into path/vectors.npy through a memmap, so the matrix is never held in RAM.
+    @classmethod
+    def build(cls, embeddings, ids, path, n_lists=None, block_size=BLOCK_SIZE, seed=0):
+        n = len(embeddings)
+        n_lists = n_lists or max(1, int(2 * np.sqrt(n)))
+        centroids = train_centroids(embeddings, n_lists, seed=seed)
+
+        assign = np.empty(n, dtype=np.int64)
+        for start in range(0, n, block_size):
+            block = normalize_rows(embeddings[start:start + block_size])
+            assign[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+
+        order = np.argsort(assign, kind="stable")
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(assign, minlength=n_lists))])
+        os.makedirs(path, exist_ok=True)
+        vectors = np.lib.format.open_memmap(os.path.join(path, "vectors.npy"), mode="w+",
+                                            dtype=np.float32, shape=(n, centroids.shape[1]))
+        for start in range(0, n, block_size):
+            rows = order[start:start + block_size]
+            vectors[start:start + len(rows)] = normalize_rows(embeddings[rows])
+        vectors.flush()
+        del vectors
+
+        np.save(os.path.join(path, "centroids.npy"), centroids)
+        np.save(os.path.join(path, "offsets.npy"), offsets)
+        np.save(os.path.join(path, "ids.npy"), np.asarray(ids)[order])
+        with open(os.path.join(path, "meta.json"), "w") as f:
+            json.dump({"n_lists": int(n_lists), "rows": int(n), "dim": int(centroids.shape[1])}, f)
+        return cls.load(path)
+
+    @classmethod
+    def load(cls, path, mmap_mode="r"):
+        arrays = [np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode)
+                  for name in ["centroids", "offsets", "vectors", "ids"]]
+        return cls(*arrays)
+
+    # Top-k for a batch of queries. Queries are grouped by probed list, so each list is
+    # read once per batch and scored against every query probing it in one product.
+    def search(self, queries, k=10, n_probe=N_PROBE):
+        queries = normalize_rows(queries)
+        n_probe = min(n_probe, self.n_lists)
+        probes = np.argpartition(-(queries @ self.centroids.T), n_probe - 1, axis=1)[:, :n_probe]
+
+        best_scores, best_rows = empty_top_k(len(queries), k)
+        query_of = np.repeat(np.arange(len(queries)), n_probe)
+        lists = probes.ravel()
+        order = np.argsort(lists, kind="stable")
+        lists, query_of = lists[order], query_of[order]
+        bounds = np.flatnonzero(np.diff(lists)) + 1
+        for group in np.split(np.arange(len(lists)), bounds):
+            if len(group) == 0:
+                continue
+            lst = lists[group[0]]
+            start, stop = int(self.offsets[lst]), int(self.offsets[lst + 1])
+            if start == stop:
+                continue
+            q = query_of[group]
+            scores = queries[q] @ np.asarray(self.vectors[start:stop]).T
+            rows = np.broadcast_to(np.arange(start, stop), scores.shape)
+            best_scores[q], best_rows[q] = merge_top_k(best_scores[q], best_rows[q], scores, rows, k)
+
+        # Fewer than k candidates in the probed lists leaves -inf padding at the end
+        scores, rows = finish_top_k(best_scores, best_rows)
+        return ids_at(self.ids, rows), scores
+
+    def search_ids(self, query_ids, k=10, n_probe=N_PROBE):
+        rows = lookup_rows(np.asarray(self.ids), query_ids)
+        return self.search(np.asarray(self.vectors)[rows], k, n_probe)
+
+
+def load_embeddings(source):
+    embeddings, ids, _ = open_embeddings(source)
+    return embeddings, ids
+
+
+def recall_at_k(found, truth):
+    return np.mean([len(np.intersect1d(f, t)) / len(t) for f, t in zip(found, truth)])
+
+
+# Recall and latency of the IVF index against the exact scan for a batch of queries
+def benchmark(embeddings, ids, index, n_queries=200, k=10, probes=(1, 2, 4, 8, 16, 32), seed=0):
+    rng = np.random.default_rng(seed)
+    query_ids = ids[rng.choice(len(ids), min(n_queries, len(ids)), replace=False)]
+    exact = ExactIndex(embeddings, ids)
+
+    start = time.perf_counter()
+    truth, _ = exact.search_ids(query_ids, k)
+    exact_ms = (time.perf_counter() - start) * 1000 / len(query_ids)
+    print(f"Exact:         {exact_ms:8.3f} ms/query")
+
+    for n_probe in probes:
+        if n_probe > index.n_lists:
+            break
+        start = time.perf_counter()
+        found, _ = index.search_ids(query_ids, k, n_probe)
+        ms = (time.perf_counter() - start) * 1000 / len(query_ids)
+        print(f"IVF n_probe={n_probe:<3} {ms:8.3f} ms/query  recall@{k} {recall_at_k(found, truth):.3f}  "
+              f"({exact_ms / ms:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Similar-speech search over stored embeddings.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    build = sub.add_parser("build", help="build and save an IVF index")
+    build.add_argument("--source", default=CONGRESS_STORE, help="embedding store directory or npz file")
+    build.add_argument("--index", default=INDEX_DIR)
+    build.add_argument("--lists", type=int, default=None)
+
+    query = sub.add_parser("query", help="print the nearest speeches to the given ids")
+    query.add_argument("ids", nargs="+")
+    query.add_argument("--index", default=INDEX_DIR)
+    query.add_argument("--k", type=int, default=10)
+    query.add_argument("--probe", type=int, default=N_PROBE)
+    query.add_argument("--exact", metavar="SOURCE", help="scan this store/npz exactly instead of using the index")
+
+    bench = sub.add_parser("bench", help="recall/latency of the index against exact search")
+    bench.add_argument("--source", default=CONGRESS_STORE)
+    bench.add_argument("--index", default=INDEX_DIR)
+    bench.add_argument("--queries", type=int, default=200)
+    bench.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        embeddings, ids = load_embeddings(args.source)
+        start = time.perf_counter()
+        index = IVFIndex.build(embeddings, ids, args.index, args.lists)
+        print(f"Built {index.n_lists}-list index over {len(ids)} embeddings in {time.perf_counter() - start:.1f}s; "
+              f"saved to {args.index}")
+
+    elif args.command == "query":
+        if args.exact:
+            searcher = ExactIndex(*load_embeddings(args.exact))
+            search = lambda q: searcher.search_ids(q, args.k)
+        else:
+            searcher = IVFIndex.load(args.index)
+            search = lambda q: searcher.search_ids(q, args.k, args.probe)
+        query_ids = [int(i) for i in args.ids] if searcher.ids.dtype.kind in "iu" else args.ids
+        found, scores = search(query_ids)
+        for query_id, row_ids, row_scores in zip(query_ids, found, scores):
+            print(f"Nearest to {query_id}:")
+            for doc_id, score in zip(row_ids, row_scores):
+                if np.isfinite(score):
+                    print(f"  {doc_id}  {score:.4f}")
+
+    elif args.command == "bench":
+        embeddings, ids = load_embeddings(args.source)
+        benchmark(embeddings, ids, IVFIndex.load(args.index), args.queries, args.k)
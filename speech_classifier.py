@@ -0,0 +1,323 @@
+import os
+import time
+import random
+import asyncio
+import argparse
+from functools import lru_cache
+from typing import List
+from dotenv import load_dotenv
+from openai import AsyncOpenAI, RateLimitError, APIConnectionError, InternalServerError
+from classification_cache import ClassificationCache, chunk_key
+
+# Load API key
+load_dotenv()
+
+DEFAULT_MODEL = "gpt-3.5-turbo"
+PROMPT_VERSION = 1   # bump whenever build_prompt or topic_labels change
+CONCURRENCY = 16
+REQUESTS_PER_MINUTE = 3500
+TOKENS_PER_MINUTE = 90_000
+MAX_RETRIES = 6
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 60.0
+
+# Topic labels
+topic_labels = [
+    "Economy and Trade",
+    "National Defense and Military",
+    "Foreign Policy and Diplomacy",
+    "Immigration and Border Policy",
+    "Civil Rights and Racial Equality",
+    "Women's Rights",
+    "LGBTQ+ Rights",
+    "Law Enforcement and Criminal Justice",
+    "Healthcare and Public Health",
+    "Education and Schools",
+    "Science, Technology, and Innovation",
+    "Climate and Environment",
+    "Infrastructure and Transportation",
+    "Government Reform and Corruption",
+    "Elections and Democratic Institutions",
+    "Religion, Values, and National Identity",
+    "Social Welfare and Poverty",
+    "Labor, Jobs, and Workers' Rights",
+    "Gun Policy and Second Amendment",
+    "Energy and Natural Resources",
+    "Terrorism, Homeland Security, and War on Terror",
+    "Indigenous and Tribal Affairs"
+]
+
+# Everything before the speech text is static, so it is built once per speech type
+@lru_cache(maxsize=None)
+def prompt_prefix(speech_type: str = "congressional") -> str:
+    numbered_topics = "\n".join([f"{i+1}. {label}" for i, label in enumerate(topic_labels)])
+    return (
+        f"You are a classification assistant labeling real U.S. {speech_type} speeches based on the main topics discussed.\n\n"
+        f"From the numbered list of topics below, select up to 5 that are clearly and substantially addressed in the speech.\n"
+        f"- Respond ONLY with a comma-separated list of topic numbers (e.g., 3, 5, 12).\n"
+        f"- Do NOT modify or write out the labels.\n"
+        f"- If no topics are clearly and substantially discussed, respond with: None\n\n"
+        f"Numbered Topics:\n{numbered_topics}\n\n"
+        f"---\nSpeech:\n"
+    )
+
+# Prompt with numbered labels; speech_type is "congressional" or "presidential"
+def build_prompt(text: str, speech_type: str = "congressional") -> str:
+    return prompt_prefix(speech_type) + text
+
+# Break text into chunks
+def chunk_text(text: str, max_chars: int = 12000) -> List[str]:
+    return [text[i:i+max_chars] for i in range(0, len(text), max_chars)]
+
+# Convert GPT output numbers to topic indices
+def parse_label_indices(output: str) -> set:
+    output = output.strip()
+    if output.lower() == "none":
+        return set()
+    indices = set()
+    for item in output.split(","):
+        item = item.strip()
+        if item.isdigit():
+            index = int(item) - 1
+            if 0 <= index < len(topic_labels):
+                indices.add(index)
+    return indices
+
+# Merge the label indices of every chunk of a document into its final label list
+def merge_labels(label_indices) -> List[str]:
+    if not label_indices:
+        return ["Unlabeled"]
+    return [topic_labels[i] for i in sorted(label_indices)[:5]]
+
+
+# Requests-per-minute and tokens-per-minute buckets shared by all in-flight calls.
+# When the server signals throttling, everyone pauses and the rate is halved; it then
+# climbs back additively on successes, so backoff only happens when the server asks for it.
+class RateLimiter:
+    def __init__(self, requests_per_minute=REQUESTS_PER_MINUTE, tokens_per_minute=TOKENS_PER_MINUTE):
+        self.max_rpm = requests_per_minute
+        self.max_tpm = tokens_per_minute
+        self.scale = 1.0
+        self.request_budget = 1.0
+        self.token_budget = float(tokens_per_minute) / 60
+        self.last = time.monotonic()
+        self.paused_until = 0.0
+        self.last_slowdown = 0.0
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self.last
+        self.last = now
+        rpm, tpm = self.max_rpm * self.scale, self.max_tpm * self.scale
+        # Burst capacity of one second's worth, so a cold start does not flood the server
+        self.request_budget = min(max(rpm / 60, 1.0), self.request_budget + elapsed * rpm / 60)
+        self.token_budget = min(max(tpm / 60, 1.0), self.token_budget + elapsed * tpm / 60)
+        return now
+
+    async def acquire(self, tokens):
+        while True:
+            now = self._refill()
+            if now < self.paused_until:
+                await asyncio.sleep(self.paused_until - now)
+                continue
+            # A prompt bigger than the burst may go once the bucket is full; the debt is paid off later
+            tokens_needed = min(tokens, max(self.max_tpm * self.scale / 60, 1.0))
+            if self.request_budget >= 1 and self.token_budget >= tokens_needed:
+                self.request_budget -= 1
+                self.token_budget -= tokens
+                return
+            rpm, tpm = self.max_rpm * self.scale, self.max_tpm * self.scale
+            wait = max((1 - self.request_budget) * 60 / rpm, (tokens_needed - self.token_budget) * 60 / tpm, 0.001)
+            await asyncio.sleep(wait)
+
+    # Requests already in flight tend to be throttled together; count such a burst once
+    def throttled(self, delay):
+        now = time.monotonic()
+        if now - self.last_slowdown > max(delay, 1.0):
+            self.scale = max(self.scale * 0.5, 0.05)
+            self.last_slowdown = now
+        self.paused_until = max(self.paused_until, now + delay)
+
+    def succeeded(self):
+        self.scale = min(1.0, self.scale + 0.05)
+
+
+def retry_delay(attempt, error=None):
+    response = getattr(error, "response", None)
+    if response is not None:
+        retry_after = response.headers.get("retry-after")
+        if retry_after:
+            try:
+                return min(float(retry_after), BACKOFF_MAX)
+            except ValueError:
+                pass
+    return min(BACKOFF_BASE * (2 ** attempt), BACKOFF_MAX) * (0.5 + random.random() / 2)
+
+
+# Rough prompt size for the tokens-per-minute budget (~4 characters per token)
+def estimate_tokens(prompt):
+    return len(prompt) // 4 + 10
+
+
+# Classifies many documents at once: every chunk of every document goes through a shared
+# queue served by `concurrency` workers under the rate limiter, and a document's labels are
+# reported through on_result(doc_id, labels) as soon as its last chunk comes back.
+# Answered chunks are looked up in `cache` before any call is made, and identical chunks
+# that are already in flight wait for that one call instead of making their own.
+# labels is None when any chunk of the document failed, so the caller can retry it later.
+class ClassificationRunner:
+    def __init__(self, model=DEFAULT_MODEL, speech_type="congressional", concurrency=CONCURRENCY,
+                 requests_per_minute=REQUESTS_PER_MINUTE, tokens_per_minute=TOKENS_PER_MINUTE,
+                 max_retries=MAX_RETRIES, api_key=None, base_url=None, cache=None, verbose=True):
+        self.model = model
+        self.speech_type = speech_type
+        self.cache = cache if cache is not None else ClassificationCache(None)
+        self.concurrency = concurrency
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_retries = max_retries
+        self.api_key = api_key or os.getenv("OPENAI_API_KEY")
+        self.base_url = base_url or os.getenv("CHAT_BASE_URL")
+        self.verbose = verbose
+        self.last_stats = {}
+
+    # Returns the chunk's label indices, or None when the call failed for good
+    async def _classify_chunk(self, client, limiter, prompt, stats):
+        for attempt in range(self.max_retries + 1):
+            await limiter.acquire(estimate_tokens(prompt))
+            try:
+                response = await client.chat.completions.create(
+                    model=self.model,
+                    messages=[{"role": "user", "content": prompt}]
+                )
+                stats["requests"] += 1
+                limiter.succeeded()
+                return parse_label_indices(response.choices[0].message.content)
+            except RateLimitError as e:
+                stats["throttled"] += 1
+                limiter.throttled(retry_delay(attempt, e))
+            except (APIConnectionError, InternalServerError) as e:
+                stats["retries"] += 1
+                await asyncio.sleep(retry_delay(attempt, e))
+            except Exception as e:
+                print(f"Error on chunk: {e}")
+                return None
+        print(f"Giving up on chunk after {self.max_retries + 1} attempts")
+        return None
+
+    async def aclassify(self, docs, on_result=None):
+        limiter = RateLimiter(self.requests_per_minute, self.tokens_per_minute)
+        queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        stats = {"docs": 0, "chunks": 0, "cached": 0, "deduped": 0, "requests": 0,
+                 "throttled": 0, "retries": 0, "failed_chunks": 0}
+        pending = {}    # doc_id -> [chunks remaining, merged label indices, any chunk failed]
+        in_flight = {}  # chunk key -> future of the call classifying it
+        results = {}
+
+        async def produce():
+            for doc_id, text in docs:
+                chunks = chunk_text(text) or [""]
+                pending[doc_id] = [len(chunks), set(), False]
+                stats["docs"] += 1
+                for chunk in chunks:
+                    await queue.put((doc_id, chunk))
+            for _ in range(self.concurrency):
+                await queue.put(None)
+
+        async def lookup(client, chunk):
+            key = chunk_key(self.model, PROMPT_VERSION, self.speech_type, chunk)
+            cached = self.cache.get(key)
+            if cached is not None:
+                stats["cached"] += 1
+                return set(cached)
+            if key in in_flight:
+                stats["deduped"] += 1
+                return await in_flight[key]
+
+            future = asyncio.get_running_loop().create_future()
+            in_flight[key] = future
+            indices = None
+            try:
+                indices = await self._classify_chunk(client, limiter, build_prompt(chunk, self.speech_type), stats)
+                if indices is not None:
+                    self.cache.put(key, indices)
+            finally:
+                # Waiters always get an answer, a failed call included
+                del in_flight[key]
+                future.set_result(indices)
+            return indices
+
+        async def work(client):
+            while True:
+                item = await queue.get()
+                if item is None:
+                    return
+                doc_id, chunk = item
+                indices = await lookup(client, chunk)
+                stats["chunks"] += 1
+                state = pending[doc_id]
+                if indices is None:
+                    stats["failed_chunks"] += 1
+                    state[2] = True
+                else:
+                    state[1] |= indices
+                state[0] -= 1
+                if state[0] == 0:
+                    del pending[doc_id]
+                    results[doc_id] = None if state[2] else merge_labels(state[1])
+                    if on_result is not None:
+                        on_result(doc_id, results[doc_id])
+
+        start = time.perf_counter()
+        async with AsyncOpenAI(api_key=self.api_key, base_url=self.base_url, max_retries=0) as client:
+            await asyncio.gather(produce(), *[work(client) for _ in range(self.concurrency)])
+        elapsed = time.perf_counter() - start
+
+        stats["seconds"] = elapsed
+        stats["docs_per_sec"] = stats["docs"] / elapsed if elapsed > 0 else 0.0
+        self.last_stats = stats
+        if self.verbose:
+            print(f"Classified {stats['docs']} docs ({stats['chunks']} chunks) in {elapsed:.1f}s — "
+                  f"{stats['docs_per_sec']:.2f} docs/sec, {stats['cached']} cached, {stats['deduped']} deduped, "
+                  f"{stats['throttled']} throttled, "
+                  f"{stats['retries']} retried, {stats['failed_chunks']} failed chunks")
+        return results
+
+    def classify(self, docs, on_result=None):
+        return asyncio.run(self.aclassify(docs, on_result))
+
+
+# Compare the old one-chunk-at-a-time loop (with its fixed sleep(1)) against the runner on a mock server
+if __name__ == "__main__":
+    from openai import OpenAI
+    from stub_chat_server import start_stub_server
+
+    parser = argparse.ArgumentParser(description="Benchmark the classification runner against a local mock chat server.")
+    parser.add_argument("--docs", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    parser.add_argument("--rpm", type=int, default=3000)
+    parser.add_argument("--tpm", type=int, default=20_000_000)
+    parser.add_argument("--rate-limit-prob", type=float, default=0.05)
+    args = parser.parse_args()
+
+    server = start_stub_server(latency=args.latency, rate_limit_prob=args.rate_limit_prob)
+    docs = [(i, f"Mr. Speaker, I rise to discuss item {i}. " * random.randint(50, 600)) for i in range(args.docs)]
+
+    client = OpenAI(api_key="stub", base_url=server.base_url, max_retries=5)
+    baseline_docs = docs[:5]
+    start = time.perf_counter()
+    for _, text in baseline_docs:
+        for chunk in chunk_text(text):
+            client.chat.completions.create(model=DEFAULT_MODEL, messages=[{"role": "user", "content": build_prompt(chunk)}])
+            time.sleep(1)
+    base_rate = len(baseline_docs) / (time.perf_counter() - start)
+    print(f"Sequential loop: {base_rate:.2f} docs/sec on {len(baseline_docs)} docs")
+
+    runner = ClassificationRunner(base_url=server.base_url, api_key="stub", concurrency=args.concurrency,
+                                  requests_per_minute=args.rpm, tokens_per_minute=args.tpm)
+    runner.classify(docs)
+    print(f"Speedup: {runner.last_stats['docs_per_sec'] / base_rate:.1f}x "
+          f"({server.request_count} requests, {server.throttled_count} throttled by server)")
+
+    server.shutdown()
@@ -0,0 +1,197 @@
+import os
+import sys
+import glob
+import json
+import shutil
+import numpy as np
+
+CORPUS_PATTERNS = ["congress_speeches*.corpus", "recovered_part_*.corpus", "congress_chunk_*.corpus"]
+TEXT_COLUMNS = ["title", "text"]
+DICT_COLUMNS = ["speaker_state", "speaker_party"]
+# Speech field -> column name in the npz files the download scripts wrote before the corpus format
+NPZ_COLUMNS = {"id": "ids", "date": "dates", "title": "titles", "text": "texts",
+               "speaker_state": "speaker_states", "speaker_party": "speaker_parties"}
+
+
+# Write speeches to a columnar corpus directory:
+#   ids.npy / dates.npy              int64 ids and datetime64[D] dates
+#   <col>.utf8 + <col>_offsets.npy   concatenated UTF-8 text with n+1 byte offsets (title, text)
+#   <col>_codes.npy + meta.json      dictionary-encoded speaker_state / speaker_party
+# `speeches` can be any iterable of speech dicts; text is streamed straight to disk.
+# The directory is built under a temporary name and renamed into place when complete.
+def write_corpus(path, speeches):
+    tmp_path = path + ".tmp"
+    if os.path.exists(tmp_path):
+        shutil.rmtree(tmp_path)
+    os.makedirs(tmp_path)
+
+    ids, dates = [], []
+    offsets = {col: [0] for col in TEXT_COLUMNS}
+    codes = {col: [] for col in DICT_COLUMNS}
+    vocab = {col: {} for col in DICT_COLUMNS}
+    text_files = {col: open(os.path.join(tmp_path, f"{col}.utf8"), "wb") for col in TEXT_COLUMNS}
+
+    try:
+        for speech in speeches:
+            ids.append(speech["id"])
+            dates.append(speech.get("date") or "NaT")
+            for col in TEXT_COLUMNS:
+                data = (speech.get(col) or "").encode("utf-8")
+                text_files[col].write(data)
+                offsets[col].append(offsets[col][-1] + len(data))
+            for col in DICT_COLUMNS:
+                value = speech.get(col) or ""
+                codes[col].append(vocab[col].setdefault(value, len(vocab[col])))
+    finally:
+        for f in text_files.values():
+            f.close()
+
+    np.save(os.path.join(tmp_path, "ids.npy"), np.array(ids, dtype=np.int64))
+    np.save(os.path.join(tmp_path, "dates.npy"), np.array(dates, dtype="datetime64[D]"))
+    for col in TEXT_COLUMNS:
+        np.save(os.path.join(tmp_path, f"{col}_offsets.npy"), np.array(offsets[col], dtype=np.int64))
+    for col in DICT_COLUMNS:
+        code_dtype = np.uint8 if len(vocab[col]) <= 256 else np.int32
+        np.save(os.path.join(tmp_path, f"{col}_codes.npy"), np.array(codes[col], dtype=code_dtype))
+
+    with open(os.path.join(tmp_path, "meta.json"), "w") as f:
+        json.dump({"rows": len(ids), "vocab": {col: list(vocab[col]) for col in DICT_COLUMNS}}, f)
+
+    if os.path.exists(path):
+        shutil.rmtree(path)
+    os.replace(tmp_path, path)
+    return len(ids)
+
+
+# Read-only, memory-mapped view of one corpus directory
+class SpeechCorpus:
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "meta.json"), "r") as f:
+            meta = json.load(f)
+        self.rows = meta["rows"]
+        self.vocab = {col: np.array(values, dtype=object) for col, values in meta["vocab"].items()}
+
+        self.ids = self._load("ids.npy")
+        self.dates = self._load("dates.npy")
+        self.offsets = {col: self._load(f"{col}_offsets.npy") for col in TEXT_COLUMNS}
+        self.codes = {col: self._load(f"{col}_codes.npy") for col in DICT_COLUMNS}
+        self.buffers = {}
+        for col in TEXT_COLUMNS:
+            buffer_path = os.path.join(path, f"{col}.utf8")
+            size = os.path.getsize(buffer_path)
+            self.buffers[col] = np.memmap(buffer_path, dtype=np.uint8, mode="r") if size else np.empty(0, np.uint8)
+
+    def _load(self, name):
+        return np.load(os.path.join(self.path, name), mmap_mode="r")
+
+    def __len__(self):
+        return self.rows
+
+    def text(self, i, col="text"):
+        offsets = self.offsets[col]
+        return self.buffers[col][offsets[i]:offsets[i + 1]].tobytes().decode("utf-8")
+
+    def title(self, i):
+        return self.text(i, "title")
+
+    # Decoded values of a dictionary-encoded column, e.g. corpus.column("speaker_party")
+    def column(self, col):
+        return self.vocab[col][self.codes[col]]
+
+    # Rebuild a speech dict in the same shape the download scripts produce
+    def __getitem__(self, i):
+        date = self.dates[i]
+        return {
+            "id": int(self.ids[i]),
+            "date": "" if np.isnat(date) else str(date),
+            "title": self.title(i),
+            "text": self.text(i),
+            "speaker_state": self.vocab["speaker_state"][self.codes["speaker_state"][i]],
+            "speaker_party": self.vocab["speaker_party"][self.codes["speaker_party"][i]],
+        }
+
+    def __iter__(self):
+        for i in range(self.rows):
+            yield self[i]
+
+
+# Several corpus parts addressed as one: global row i lives in part searchsorted(starts, i)
+class CorpusSet:
+    def __init__(self, paths):
+        self.parts = [SpeechCorpus(p) for p in paths]
+        self.starts = np.cumsum([0] + [len(p) for p in self.parts])
+        self.rows = int(self.starts[-1])
+
+    def __len__(self):
+        return self.rows
+
+    def _locate(self, i):
+        part = int(np.searchsorted(self.starts, i, side="right")) - 1
+        return self.parts[part], i - int(self.starts[part])
+
+    @property
+    def ids(self):
+        return np.concatenate([p.ids for p in self.parts]) if self.parts else np.empty(0, np.int64)
+
+    @property
+    def dates(self):
+        return np.concatenate([p.dates for p in self.parts]) if self.parts else np.empty(0, "datetime64[D]")
+
+    def text(self, i, col="text"):
+        part, j = self._locate(i)
+        return part.text(j, col)
+
+    def __getitem__(self, i):
+        part, j = self._locate(i)
+        return part[j]
+
+    def __iter__(self):
+        for part in self.parts:
+            yield from part
+
+    # Random-access a subset of rows, e.g. a random sample of indices
+    def take(self, indices):
+        return [self[int(i)] for i in indices]
+
+
+# Open every corpus part matching the given patterns (defaults to all downloaded Congress parts)
+def open_corpus(*patterns):
+    patterns = patterns or CORPUS_PATTERNS
+    paths = []
+    for pattern in patterns:
+        paths.extend(sorted(glob.glob(pattern)))
+    return CorpusSet(paths)
+
+
+# Speeches from a file written before the corpus format: a JSON list of speech dicts
+# (congress_speeches_recovered.json, recovered_part_*.json, congress_chunk_*.json), a JSON
+# Lines log, or an npz of parallel columns (congress_chunk_*.npz)
+def read_speeches(path):
+    if path.endswith(".npz"):
+        with np.load(path, allow_pickle=True) as data:
+            columns = {field: data[name] for field, name in NPZ_COLUMNS.items() if name in data}
+        for i in range(len(columns["id"])):
+            yield {field: values[i] for field, values in columns.items()}
+    elif path.endswith(".jsonl"):
+        with open(path, "r") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    else:
+        with open(path, "r") as f:
+            yield from json.load(f)
+
+
+# One-shot conversion of an old download file into <name>.corpus next to it
+def import_corpus(path, output_path=None):
+    output_path = output_path or os.path.splitext(path)[0] + ".corpus"
+    return write_corpus(output_path, read_speeches(path)), output_path
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        sys.exit("usage: python speech_corpus.py FILE.json|FILE.jsonl|FILE.npz ...")
+    for path in sys.argv[1:]:
+        total, output_path = import_corpus(path)
+        print(f"Imported {total} speeches from {path} into {output_path}")
@@ -0,0 +1,178 @@
+import zipfile
+import argparse
+import numpy as np
+
+# Typed, pickle-free layout shared by every per-speech .npz file:
+#   ids            int64            (Congress)  or  doc_names  fixed-width str  (presidential)
+#   dates          datetime64[D]
+#   label_offsets  int64 (N + 1)    labels of speech i are label_codes[label_offsets[i]:label_offsets[i + 1]]
+#   label_codes    int8             indices into label_names
+#   label_names    fixed-width str
+#   embeddings     float32 (N, D)
+# plus any other plain numeric arrays (pca_2d, umap_2d, ...).
+
+
+def to_dates(dates):
+    dates = np.asarray(dates)
+    if dates.dtype.kind == "M":
+        return dates.astype("datetime64[D]")
+    # "YYYY-MM-DD" or "YYYY-MM-DD hh:mm:ss" strings; empty strings become NaT
+    return dates.astype(str).astype("U10").astype("datetime64[D]")
+
+
+# CSR label index from per-speech label lists
+def encode_labels(label_lists, label_names=None):
+    if label_names is None:
+        label_names = sorted({label for labels in label_lists for label in labels})
+    index = {label: i for i, label in enumerate(label_names)}
+    lengths = np.fromiter((len(labels) for labels in label_lists), dtype=np.int64, count=len(label_lists))
+    offsets = np.concatenate([[0], np.cumsum(lengths)])
+    codes = np.array([index[label] for labels in label_lists for label in labels], dtype=np.int8)
+    return offsets, codes, np.array(label_names)
+
+
+def save_dataset(path, ids=None, doc_names=None, dates=None, labels=None, label_names=None, embeddings=None, **arrays):
+    out = {}
+    if ids is not None:
+        out["ids"] = np.asarray(ids, dtype=np.int64)
+    if doc_names is not None:
+        out["doc_names"] = np.asarray(doc_names).astype(str)
+    if dates is not None:
+        out["dates"] = to_dates(dates)
+    if labels is not None:
+        out["label_offsets"], out["label_codes"], out["label_names"] = encode_labels(labels, label_names)
+    if embeddings is not None:
+        out["embeddings"] = np.asarray(embeddings, dtype=np.float32)
+    out.update(arrays)
+    # Uncompressed, so members can be memory-mapped straight out of the archive
+    np.savez(path, **out)
+
+
+# Memory-map the arrays of an uncompressed .npz (np.load ignores mmap_mode for archives)
+def _mmap_npz(path, mode):
+    arrays = {}
+    with zipfile.ZipFile(path) as archive, open(path, "rb") as f:
+        for info in archive.infolist():
+            if info.compress_type != zipfile.ZIP_STORED:
+                raise ValueError(f"{path} is compressed; save it with np.savez to memory-map it")
+            # Local file header: 30 fixed bytes, then the name and extra field
+            f.seek(info.header_offset + 26)
+            name_len, extra_len = np.frombuffer(f.read(4), dtype="<u2")
+            f.seek(info.header_offset + 30 + int(name_len) + int(extra_len))
+            version = np.lib.format.read_magic(f)
+            read_header = np.lib.format.read_array_header_1_0 if version == (1, 0) else np.lib.format.read_array_header_2_0
+            shape, fortran_order, dtype = read_header(f)
+            if dtype.hasobject:
+                raise ValueError(f"{path} holds object arrays")
+            arrays[info.filename[:-len(".npy")]] = np.memmap(
+                path, dtype=dtype, mode=mode, offset=f.tell(), shape=shape, order="F" if fortran_order else "C")
+    return arrays
+
+
+# A loaded dataset file: arrays by name plus vectorized year and label helpers
+class SpeechDataset:
+    def __init__(self, arrays):
+        self.arrays = arrays
+        # Older Congress files (e.g. congress_embeddings_99k_filtered.npz) key speeches by doc_ids
+        if "doc_ids" in arrays and "ids" not in arrays:
+            self.arrays["ids"] = arrays.pop("doc_ids")
+        if "dates" in arrays and arrays["dates"].dtype.kind != "M":
+            self.arrays["dates"] = to_dates(arrays["dates"])
+
+    def __contains__(self, name):
+        return name in self.arrays
+
+    def __getitem__(self, name):
+        return self.arrays[name]
+
+    @property
+    def files(self):
+        return list(self.arrays)
+
+    @property
+    def ids(self):
+        for name in ["ids", "doc_names"]:
+            if name in self.arrays:
+                return self.arrays[name]
+        raise KeyError(f"dataset has no ids or doc_names (arrays: {self.files})")
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def dates(self):
+        return self.arrays["dates"]
+
+    @property
+    def years(self):
+        return self.dates.astype("datetime64[Y]").astype(np.int64) + 1970
+
+    @property
+    def label_names(self):
+        return list(self.arrays["label_names"])
+
+    # Speech row of every (row, code) pair in the label index
+    def label_rows(self):
+        return np.repeat(np.arange(len(self)), np.diff(self.arrays["label_offsets"]))
+
+    def labels(self, i):
+        offsets, codes = self.arrays["label_offsets"], self.arrays["label_codes"]
+        return [self.label_names[c] for c in codes[offsets[i]:offsets[i + 1]]]
+
+    def label_lists(self):
+        return [self.labels(i) for i in range(len(self))]
+
+    # (N, L) bool matrix of label membership
+    def label_matrix(self):
+        matrix = np.zeros((len(self), len(self.label_names)), dtype=bool)
+        matrix[self.label_rows(), self.arrays["label_codes"]] = True
+        return matrix
+
+    def has_label(self, name):
+        matrix = np.zeros(len(self), dtype=bool)
+        hit = np.asarray(self.arrays["label_codes"]) == self.label_names.index(name)
+        matrix[self.label_rows()[hit]] = True
+        return matrix
+
+
+def load_dataset(path, mmap_mode=None):
+    try:
+        if mmap_mode:
+            return SpeechDataset(_mmap_npz(path, mmap_mode))
+        with np.load(path) as data:
+            return SpeechDataset({name: data[name] for name in data.files})
+    except ValueError as e:
+        raise ValueError(f"{path} is not in the typed dataset format ({e}); "
+                         f"convert it with: python speech_dataset.py {path}") from None
+
+
+# Rewrite an old pickled npz (object arrays of lists/strings/arrays) in the typed layout,
+# optionally recording the embedding model its vectors came from
+def convert_legacy(path, output_path=None, model=None):
+    with np.load(path, allow_pickle=True) as data:
+        arrays = {name: data[name] for name in data.files}
+    kwargs = {}
+    for name in ["doc_names", "dates"]:
+        if name in arrays:
+            kwargs[name] = arrays.pop(name)
+    for name in ["ids", "doc_ids"]:
+        if name in arrays:
+            kwargs["ids"] = arrays.pop(name)
+    if "labels" in arrays:
+        kwargs["labels"] = [list(labels) for labels in arrays.pop("labels")]
+    if "embeddings" in arrays:
+        embeddings = arrays.pop("embeddings")
+        kwargs["embeddings"] = np.stack(embeddings) if embeddings.dtype == object else embeddings
+    if model is not None:
+        arrays["model"] = np.array(model)
+    save_dataset(output_path or path, **kwargs, **arrays)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert pickled .npz files to the typed dataset format in place.")
+    parser.add_argument("paths", nargs="+")
+    parser.add_argument("--model", help="record the embedding model of the files' vectors")
+    args = parser.parse_args()
+    for path in args.paths:
+        convert_legacy(path, model=args.model)
+        print(f"Converted {path} to the typed dataset format")
@@ -0,0 +1,165 @@
+import time
+import random
+import threading
+import argparse
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
+
+BASE_URL = "http://congressionalspeech.lib.uiowa.edu/api.php/speeches"
+PAGE_SIZE = 50
+WORKERS = 8            # pages fetched concurrently
+RATE_PER_SEC = 5.0     # sustained page requests per second across all workers
+BURST = 5              # token bucket capacity
+MAX_RETRIES = 5
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 60.0
+TIMEOUT = 60
+
+
+# Thread-safe token bucket: acquire() blocks until a request may be sent
+class TokenBucket:
+    def __init__(self, rate=RATE_PER_SEC, capacity=BURST):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.last = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.last) * self.rate)
+                self.last = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+# One pooled session shared by all workers so connections are kept alive and reused
+def make_session(pool_size=WORKERS):
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+# Keep only the fields we store for each speech
+def filter_entry(entry):
+    return {
+        "id": entry["id"],
+        "date": entry.get("date", ""),
+        "title": entry.get("title", ""),
+        "text": entry.get("speaking", ""),
+        "speaker_state": entry.get("speaker_state", ""),
+        "speaker_party": entry.get("speaker_party", "")
+    }
+
+
+def page_url(page, base_url=BASE_URL, page_size=PAGE_SIZE):
+    return f"{base_url}?transform=1&order=id&page={page},{page_size}"
+
+
+# Fetch one page, retrying with exponential backoff on errors and non-200 responses.
+# Returns the list of raw speech entries (empty at the end of the data).
+def fetch_page(session, page, bucket=None, base_url=BASE_URL, page_size=PAGE_SIZE, max_retries=MAX_RETRIES):
+    url = page_url(page, base_url, page_size)
+    for attempt in range(max_retries + 1):
+        if bucket is not None:
+            bucket.acquire()
+        try:
+            response = session.get(url, timeout=TIMEOUT)
+            if response.status_code == 200:
+                page_data = response.json()
+                if isinstance(page_data, dict) and "speeches" in page_data:
+                    return page_data["speeches"]
+                if isinstance(page_data, list):
+                    return page_data
+                raise ValueError("Unexpected response format.")
+            error = f"HTTP {response.status_code}"
+            retry_after = response.headers.get("Retry-After")
+        except (requests.RequestException, ValueError) as e:
+            error = str(e)
+            retry_after = None
+
+        if attempt == max_retries:
+            raise RuntimeError(f"Page {page} failed after {attempt + 1} attempts: {error}")
+        try:
+            delay = float(retry_after)
+        except (TypeError, ValueError):
+            delay = min(BACKOFF_BASE * (2 ** attempt), BACKOFF_MAX) * (0.5 + random.random() / 2)
+        print(f"Page {page}: {error}, retrying in {delay:.1f}s...")
+        time.sleep(delay)
+
+
+# Yield (page, entries) in page order starting at start_page, keeping up to `workers`
+# pages in flight. Stops at the first empty page (the end of the data); a page that still
+# fails after max_retries raises RuntimeError, so callers can stop without finalizing.
+def iter_pages(start_page=1, base_url=BASE_URL, page_size=PAGE_SIZE, workers=WORKERS,
+               rate=RATE_PER_SEC, burst=BURST, max_retries=MAX_RETRIES, session=None):
+    session = session or make_session(workers)
+    bucket = TokenBucket(rate, burst) if rate else None
+    executor = ThreadPoolExecutor(max_workers=workers)
+    in_flight = deque()
+    next_page = start_page
+
+    try:
+        while True:
+            while len(in_flight) < workers:
+                future = executor.submit(fetch_page, session, next_page, bucket, base_url, page_size, max_retries)
+                in_flight.append((next_page, future))
+                next_page += 1
+
+            page, future = in_flight.popleft()
+            entries = future.result()
+            if not entries:
+                print("No more data returned.")
+                return
+            yield page, entries
+    finally:
+        for _, future in in_flight:
+            future.cancel()
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+# Compare the old sequential loop against the concurrent fetcher on the stand-in server
+if __name__ == "__main__":
+    from stub_speech_server import start_stub_server
+
+    parser = argparse.ArgumentParser(description="Benchmark the concurrent page fetcher against a local stand-in server.")
+    parser.add_argument("--pages", type=int, default=40)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--rate", type=float, default=20.0)
+    parser.add_argument("--error-prob", type=float, default=0.05)
+    args = parser.parse_args()
+
+    server = start_stub_server(total_speeches=args.pages * PAGE_SIZE, latency=args.latency, error_prob=args.error_prob)
+
+    start = time.perf_counter()
+    page = 1
+    while True:
+        response = requests.get(page_url(page, server.base_url))
+        if response.status_code != 200:
+            continue
+        if not response.json()["speeches"]:
+            break
+        page += 1
+        time.sleep(0.5)
+    sequential = time.perf_counter() - start
+    print(f"Sequential (bare requests.get + sleep(0.5)): {page - 1} pages in {sequential:.2f}s")
+
+    start = time.perf_counter()
+    ids = [entry["id"] for _, entries in iter_pages(1, server.base_url, workers=args.workers, rate=args.rate, max_retries=8)
+           for entry in entries]
+    concurrent = time.perf_counter() - start
+    print(f"Concurrent ({args.workers} workers, {args.rate}/s): {len(ids)} speeches in {concurrent:.2f}s, "
+          f"in order: {ids == sorted(ids)}")
+    print(f"Speedup: {sequential / concurrent:.1f}x")
+
+    server.shutdown()
@@ -0,0 +1,118 @@
+import re
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Local stand-in for the OpenAI chat completions endpoint, used to measure the labeling
+# runners offline. The answer is a deterministic function of the speech part of the prompt.
+N_TOPICS = 22
+
+
+def fake_answer(prompt):
+    speech = prompt.rsplit("Speech:\n", 1)[-1]
+    digest = hashlib.sha1(speech.encode("utf-8")).digest()
+    if digest[0] < 40:
+        return "None"
+    count = 1 + digest[1] % 3
+    return ", ".join(str(1 + b % N_TOPICS) for b in digest[2:2 + count])
+
+
+class StubChatHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        server = self.server
+        server.count_request()
+
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+            return
+
+        if random.random() < server.rate_limit_prob:
+            server.count_throttled()
+            self._send_json(
+                429,
+                {"error": {"message": "Rate limit reached", "type": "rate_limit_exceeded"}},
+                headers={"Retry-After": str(server.retry_after)},
+            )
+            return
+
+        time.sleep(server.latency)
+        prompt = request["messages"][-1]["content"]
+        answer = fake_answer(prompt)
+        n_prompt = len(re.findall(r"\S+", prompt))
+        self._send_json(200, {
+            "id": "chatcmpl-stub",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "stub"),
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": answer}}],
+            "usage": {"prompt_tokens": n_prompt, "completion_tokens": 3, "total_tokens": n_prompt + 3},
+        })
+
+
+class StubChatServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency=0.5, rate_limit_prob=0.0, retry_after=0.2):
+        super().__init__(address, StubChatHandler)
+        self.latency = latency
+        self.rate_limit_prob = rate_limit_prob
+        self.retry_after = retry_after
+        self.request_count = 0
+        self.throttled_count = 0
+        self._lock = threading.Lock()
+
+    def count_request(self):
+        with self._lock:
+            self.request_count += 1
+
+    def count_throttled(self):
+        with self._lock:
+            self.throttled_count += 1
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+
+# Start the stub server in a background thread and return it
+def start_stub_server(host="127.0.0.1", port=0, **kwargs):
+    server = StubChatServer((host, port), **kwargs)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve fake topic answers on an OpenAI-compatible chat endpoint.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8002)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--rate-limit-prob", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = StubChatServer((args.host, args.port), latency=args.latency, rate_limit_prob=args.rate_limit_prob)
+    print(f"Stub chat server listening on {server.base_url}")
+    server.serve_forever()
@@ -0,0 +1,122 @@
+import json
+import time
+import base64
+import random
+import hashlib
+import argparse
+import threading
+import numpy as np
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Local stand-in for the OpenAI embeddings endpoint, used to benchmark offline.
+# Vectors are deterministic per input text so repeated runs are comparable.
+DIM = 1536
+
+
+def fake_embedding(text, dim=DIM):
+    seed = int.from_bytes(hashlib.sha1(text.encode("utf-8")).digest()[:8], "little")
+    vec = np.random.default_rng(seed).standard_normal(dim).astype(np.float32)
+    return vec / np.linalg.norm(vec)
+
+
+class StubEmbeddingHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        server = self.server
+        server.count_request()
+
+        if not self.path.rstrip("/").endswith("/embeddings"):
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+            return
+
+        if random.random() < server.rate_limit_prob:
+            self._send_json(
+                429,
+                {"error": {"message": "Rate limit reached", "type": "rate_limit_exceeded"}},
+                headers={"Retry-After": "0.05"},
+            )
+            return
+
+        inputs = request.get("input", [])
+        if isinstance(inputs, str):
+            inputs = [inputs]
+
+        # Simulate round-trip latency plus a small per-input cost
+        time.sleep(server.latency + server.per_input_latency * len(inputs))
+
+        encoding_format = request.get("encoding_format", "float")
+        data = []
+        for i, text in enumerate(inputs):
+            vec = fake_embedding(text, server.dim)
+            if encoding_format == "base64":
+                embedding = base64.b64encode(vec.tobytes()).decode("ascii")
+            else:
+                embedding = vec.tolist()
+            data.append({"object": "embedding", "index": i, "embedding": embedding})
+
+        n_tokens = sum(len(text) // 4 for text in inputs)
+        self._send_json(200, {
+            "object": "list",
+            "data": data,
+            "model": request.get("model", "stub"),
+            "usage": {"prompt_tokens": n_tokens, "total_tokens": n_tokens},
+        })
+
+
+class StubEmbeddingServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency=0.2, per_input_latency=0.0005, rate_limit_prob=0.0, dim=DIM):
+        super().__init__(address, StubEmbeddingHandler)
+        self.latency = latency
+        self.per_input_latency = per_input_latency
+        self.rate_limit_prob = rate_limit_prob
+        self.dim = dim
+        self.request_count = 0
+        self._lock = threading.Lock()
+
+    def count_request(self):
+        with self._lock:
+            self.request_count += 1
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+
+# Start the stub server in a background thread and return it
+def start_stub_server(host="127.0.0.1", port=0, **kwargs):
+    server = StubEmbeddingServer((host, port), **kwargs)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve fake embeddings on an OpenAI-compatible endpoint.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--rate-limit-prob", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = StubEmbeddingServer((args.host, args.port), latency=args.latency, rate_limit_prob=args.rate_limit_prob)
+    print(f"Stub embedding server listening on {server.base_url}")
+    server.serve_forever()
@@ -0,0 +1,103 @@
+import json
+import time
+import random
+import argparse
+import threading
+from datetime import date, timedelta
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Local stand-in for the congressionalspeech api.php/speeches endpoint, used to test and
+# benchmark the downloaders offline. Speeches are generated deterministically from their id.
+STATES = ["CA", "TX", "NY", "FL", "OH", "HI"]
+PARTIES = ["D", "R", "I"]
+
+
+def fake_speech(speech_id):
+    rng = random.Random(speech_id)
+    return {
+        "id": speech_id,
+        "date": str(date(1995, 1, 1) + timedelta(days=speech_id % 7000)),
+        "title": f"SPEECH {speech_id}",
+        "speaking": " ".join(rng.choice(["Mr.", "Speaker,", "the", "bill", "trade", "veterans", "school", "tax"])
+                             for _ in range(rng.randint(20, 200))),
+        "speaker_state": rng.choice(STATES),
+        "speaker_party": rng.choice(PARTIES),
+    }
+
+
+class StubSpeechHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        server = self.server
+        server.count_request()
+        url = urlparse(self.path)
+        if not url.path.endswith("/speeches"):
+            self._send_json(404, {"error": f"Unknown path {url.path}"})
+            return
+
+        time.sleep(server.latency)
+        if random.random() < server.error_prob:
+            self._send_json(503, {"error": "Service temporarily unavailable"})
+            return
+
+        page, page_size = (int(x) for x in parse_qs(url.query)["page"][0].split(","))
+        first = (page - 1) * page_size + 1
+        last = min(first + page_size - 1, server.total_speeches)
+        self._send_json(200, {"speeches": [fake_speech(i) for i in range(first, last + 1)]})
+
+
+class StubSpeechServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, total_speeches=2000, latency=0.2, error_prob=0.0):
+        super().__init__(address, StubSpeechHandler)
+        self.total_speeches = total_speeches
+        self.latency = latency
+        self.error_prob = error_prob
+        self.request_count = 0
+        self._lock = threading.Lock()
+
+    def count_request(self):
+        with self._lock:
+            self.request_count += 1
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/api.php/speeches"
+
+
+# Start the stand-in server in a background thread and return it
+def start_stub_server(host="127.0.0.1", port=0, **kwargs):
+    server = StubSpeechServer((host, port), **kwargs)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve fake congressional speeches on a local api.php/speeches endpoint.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--total", type=int, default=2000)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--error-prob", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = StubSpeechServer((args.host, args.port), total_speeches=args.total, latency=args.latency,
+                              error_prob=args.error_prob)
+    print(f"Stub speech server listening on {server.base_url}")
+    server.serve_forever()
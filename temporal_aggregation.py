@@ -0,0 +1,156 @@
+import time
+import argparse
+import numpy as np
+from scipy import sparse
+from embedding_store import open_embeddings, embedding_model, CONGRESS_STORE
+from centroid_labeler import CentroidLabeler, CONGRESS_CENTROIDS_FILE, CONGRESS_THRESHOLDS_FILE
+
+BLOCK_SIZE = 20_000
+GROUPINGS = ("year", "congress", "president")
+
+# Start of each presidential term (inauguration, or succession on a death/resignation)
+PRESIDENTS = [
+    ("1789-04-30", "George Washington"), ("1797-03-04", "John Adams"), ("1801-03-04", "Thomas Jefferson"),
+    ("1809-03-04", "James Madison"), ("1817-03-04", "James Monroe"), ("1825-03-04", "John Quincy Adams"),
+    ("1829-03-04", "Andrew Jackson"), ("1837-03-04", "Martin Van Buren"), ("1841-03-04", "William Henry Harrison"),
+    ("1841-04-04", "John Tyler"), ("1845-03-04", "James K. Polk"), ("1849-03-04", "Zachary Taylor"),
+    ("1850-07-09", "Millard Fillmore"), ("1853-03-04", "Franklin Pierce"), ("1857-03-04", "James Buchanan"),
+    ("1861-03-04", "Abraham Lincoln"), ("1865-04-15", "Andrew Johnson"), ("1869-03-04", "Ulysses S. Grant"),
+    ("1877-03-04", "Rutherford B. Hayes"), ("1881-03-04", "James A. Garfield"), ("1881-09-19", "Chester A. Arthur"),
+    ("1885-03-04", "Grover Cleveland"), ("1889-03-04", "Benjamin Harrison"), ("1893-03-04", "Grover Cleveland (2nd term)"),
+    ("1897-03-04", "William McKinley"), ("1901-09-14", "Theodore Roosevelt"), ("1909-03-04", "William Howard Taft"),
+    ("1913-03-04", "Woodrow Wilson"), ("1921-03-04", "Warren G. Harding"), ("1923-08-02", "Calvin Coolidge"),
+    ("1929-03-04", "Herbert Hoover"), ("1933-03-04", "Franklin D. Roosevelt"), ("1945-04-12", "Harry S. Truman"),
+    ("1953-01-20", "Dwight D. Eisenhower"), ("1961-01-20", "John F. Kennedy"), ("1963-11-22", "Lyndon B. Johnson"),
+    ("1969-01-20", "Richard M. Nixon"), ("1974-08-09", "Gerald R. Ford"), ("1977-01-20", "Jimmy Carter"),
+    ("1981-01-20", "Ronald Reagan"), ("1989-01-20", "George H. W. Bush"), ("1993-01-20", "Bill Clinton"),
+    ("2001-01-20", "George W. Bush"), ("2009-01-20", "Barack Obama"), ("2017-01-20", "Donald Trump"),
+    ("2021-01-20", "Joe Biden"), ("2025-01-20", "Donald Trump (2nd term)"),
+]
+PRESIDENT_STARTS = np.array([start for start, _ in PRESIDENTS], dtype="datetime64[D]")
+
+
+def years(dates):
+    return dates.astype("datetime64[Y]").astype(np.int64) + 1970
+
+
+# Number of the Congress sitting on each date. Congresses start in odd years: on March 4
+# until 1933, on January 3 from 1935 (the 20th Amendment).
+def congress_numbers(dates):
+    year = years(dates)
+    number = (year - 1789) // 2 + 1
+    start = np.where(year < 1935, "03-04", "01-03")
+    odd_year_start = np.char.add(np.char.add(year.astype(str), "-"), start).astype("datetime64[D]")
+    before_start = (year % 2 == 1) & (dates < odd_year_start)
+    return number - before_start
+
+
+# Dense group code per speech, plus the group keys/names and the first date of each group
+def group_speeches(dates, by):
+    valid = ~np.isnat(dates)
+    if by == "year":
+        keys = years(dates)
+    elif by == "congress":
+        keys = congress_numbers(dates)
+    elif by == "president":
+        keys = np.searchsorted(PRESIDENT_STARTS, dates, side="right") - 1
+        valid &= keys >= 0
+    else:
+        raise ValueError(f"by must be one of {GROUPINGS}, got {by!r}")
+
+    groups, codes = np.unique(keys[valid], return_inverse=True)
+    all_codes = np.full(len(dates), -1, dtype=np.int64)
+    all_codes[valid] = codes
+    if by == "president":
+        names = np.array([PRESIDENTS[k][1] for k in groups])
+    else:
+        names = groups.astype(str)
+    return all_codes, groups, names
+
+
+# One pass over the embeddings, block by block: per-group sums of unit vectors, label
+# assignments from the centroid labeler and mean similarity to every label centroid.
+def aggregate(embeddings, codes, n_groups, labeler, block_size=BLOCK_SIZE):
+    n_labels = len(labeler.labels)
+    sums = np.zeros((n_groups, embeddings.shape[1]), dtype=np.float64)
+    counts = np.zeros(n_groups, dtype=np.int64)
+    label_counts = np.zeros((n_groups, n_labels), dtype=np.int64)
+    similarity_sums = np.zeros((n_groups, n_labels), dtype=np.float64)
+
+    for start in range(0, len(codes), block_size):
+        block_codes = codes[start:start + block_size]
+        rows = np.flatnonzero(block_codes >= 0)
+        if len(rows) == 0:
+            continue
+        block = np.asarray(embeddings[start + rows], dtype=np.float32)
+        block /= np.maximum(np.linalg.norm(block, axis=1, keepdims=True), 1e-12)
+        scores = labeler.scores(block)
+
+        # Group one-hot rows, so every per-group sum is a single sparse-dense product
+        onehot = sparse.csr_matrix((np.ones(len(rows)), (block_codes[rows], np.arange(len(rows)))),
+                                   shape=(n_groups, len(rows)))
+        sums += onehot @ block
+        counts += np.bincount(block_codes[rows], minlength=n_groups)
+        label_counts += (onehot @ labeler.assign(scores).astype(np.float64)).astype(np.int64)
+        similarity_sums += onehot @ scores
+        print(f"Aggregated {min(start + block_size, len(codes))}/{len(codes)} speeches...", end="\r")
+    print()
+    return sums, counts, label_counts, similarity_sums
+
+
+# Cosine distance between each group's centroid and the previous non-empty group's
+def centroid_drift(centroids, counts):
+    drift = np.full(len(centroids), np.nan, dtype=np.float32)
+    present = np.flatnonzero(counts > 0)
+    if len(present) > 1:
+        drift[present[1:]] = 1 - (centroids[present[1:]] * centroids[present[:-1]]).sum(axis=1)
+    return drift
+
+
+# Label shares and similarities need centroids (and thresholds) from the source's embedding model
+def build_cube(source, by="year", centroids_path=CONGRESS_CENTROIDS_FILE,
+               thresholds_path=CONGRESS_THRESHOLDS_FILE, block_size=BLOCK_SIZE):
+    labeler = CentroidLabeler.load(centroids_path, thresholds_path)
+    labeler.require_model(embedding_model(source), source)
+    embeddings, _, dates = open_embeddings(source)
+    if dates is None:
+        raise ValueError(f"{source} has no dates to group by")
+    codes, groups, names = group_speeches(np.asarray(dates, dtype="datetime64[D]"), by)
+    sums, counts, label_counts, similarity_sums = aggregate(embeddings, codes, len(groups), labeler, block_size)
+
+    nonempty = np.maximum(counts, 1)[:, None]
+    centroids = sums / nonempty
+    centroids /= np.maximum(np.linalg.norm(centroids, axis=1, keepdims=True), 1e-12)
+    return {
+        "by": np.array(by),
+        "groups": groups,
+        "group_names": names,
+        "counts": counts,
+        "centroids": centroids.astype(np.float32),
+        "label_names": np.array(labeler.labels),
+        "model": np.array(labeler.model or ""),
+        "label_shares": (label_counts / nonempty).astype(np.float32),
+        "label_similarity": (similarity_sums / nonempty).astype(np.float32),
+        "drift": centroid_drift(centroids, counts),
+    }
+
+
+def cube_path(by, source=CONGRESS_STORE):
+    return f"{source.rstrip('/').removesuffix('.npz')}_{by}_cube.npz"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Aggregate speech embeddings over time into a small cube for plotting.")
+    parser.add_argument("--source", default=CONGRESS_STORE, help="embedding store directory or dataset npz")
+    parser.add_argument("--by", choices=GROUPINGS, default="year")
+    parser.add_argument("--centroids", default=CONGRESS_CENTROIDS_FILE, help="label centroids from the source's embedding model")
+    parser.add_argument("--thresholds", default=CONGRESS_THRESHOLDS_FILE)
+    parser.add_argument("--output", default=None, help="defaults to <source>_<by>_cube.npz")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    cube = build_cube(args.source, args.by, args.centroids, args.thresholds)
+    output = args.output or cube_path(args.by, args.source)
+    np.savez(output, **cube)
+    print(f"Aggregated {int(cube['counts'].sum())} speeches into {len(cube['groups'])} {args.by} groups "
+          f"in {time.perf_counter() - start:.1f}s; saved to {output}")
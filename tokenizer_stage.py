@@ -0,0 +1,52 @@
+import os
+from functools import lru_cache
+import tiktoken
+
+MAX_TOKENS = 8191
+DEFAULT_MODEL = "text-embedding-3-small"
+BATCH_SIZE = 1000           # texts per encode_batch call, bounds the token lists held in memory
+NUM_THREADS = os.cpu_count() or 4
+
+
+# Load the encoder once per process and model
+@lru_cache(maxsize=None)
+def get_encoding(model=DEFAULT_MODEL):
+    return tiktoken.encoding_for_model(model)
+
+
+# Token-safe truncation of a single text.
+# Returns (text, n_tokens); the text is only decoded again when it was actually cut.
+def truncate_to_token_limit(text, max_tokens=MAX_TOKENS, model=DEFAULT_MODEL):
+    encoding = get_encoding(model)
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text, len(tokens)
+    return encoding.decode(tokens[:max_tokens]), max_tokens
+
+
+# Truncate many texts with encode_batch spread over a thread pool (tiktoken releases the GIL).
+# Returns (truncated_texts, token_counts) aligned with the input.
+def truncate_batch(texts, max_tokens=MAX_TOKENS, model=DEFAULT_MODEL, num_threads=NUM_THREADS, batch_size=BATCH_SIZE):
+    encoding = get_encoding(model)
+    texts = list(texts)
+    truncated = list(texts)
+    token_counts = [0] * len(texts)
+
+    for start in range(0, len(texts), batch_size):
+        batch = texts[start:start + batch_size]
+        encoded = encoding.encode_batch(batch, num_threads=num_threads, disallowed_special=())
+
+        too_long = []
+        for offset, tokens in enumerate(encoded):
+            if len(tokens) > max_tokens:
+                too_long.append(offset)
+                token_counts[start + offset] = max_tokens
+            else:
+                token_counts[start + offset] = len(tokens)
+
+        if too_long:
+            decoded = encoding.decode_batch([encoded[j][:max_tokens] for j in too_long], num_threads=num_threads)
+            for offset, text in zip(too_long, decoded):
+                truncated[start + offset] = text
+
+    return truncated, token_counts